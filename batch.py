@@ -0,0 +1,120 @@
+'''Solving many crossword puzzle files across a pool of worker processes.'''
+
+import concurrent.futures
+import json
+import os
+import sys
+
+import solver
+
+from formats import load_grid
+from lexicon import load_lexicon
+
+# The puzzle files taken from a directory (see `formats.load_grid()`)
+PUZZLE_EXTENSIONS = ('.txt', '.puz', '.ipuz')
+
+# Set once in each worker process by `start_worker()`
+worker_lexicon = None
+worker_options = None
+
+def find_puzzles(path):
+
+    '''Lists the puzzle files to be solved.
+
+    :param path: A directory, whose '.txt', '.puz' and '.ipuz' files are taken in name
+                 order, or a manifest file listing one puzzle path per line (relative to
+                 the manifest)
+    :return: The list of puzzle file paths
+    '''
+
+    if os.path.isdir(path):
+
+        return [os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith(PUZZLE_EXTENSIONS)]
+
+    with open(path, 'r') as manifest:
+
+        lines = [line.strip() for line in manifest]
+
+    return [os.path.join(os.path.dirname(path), line) for line in lines
+            if line and not line.startswith('#')]
+
+
+def start_worker(source, options):
+
+    '''Loads the lexicon once when a worker process starts.
+
+    The compiled cache is memory-mapped, so every worker shares the same pages.
+
+    :param source: The path of the word list
+    :param options: The `SolveOptions` every puzzle is solved with
+    '''
+
+    global worker_lexicon, worker_options
+
+    worker_lexicon = load_lexicon(source)
+    worker_options = options
+
+
+def solve_file(path):
+
+    '''Solves one puzzle file in a worker process.
+
+    :param path: The path of the puzzle file
+    :return: A dictionary describing the result, ready to be written as JSON
+    '''
+
+    try:
+
+        crossword = load_grid(path, worker_lexicon.letter_case())
+        result = solver.solve(crossword, worker_lexicon, worker_options)
+
+    except (OSError, ValueError, IndexError) as error:
+
+        return {'puzzle': path, 'error': str(error)}
+
+    return dict(puzzle=path, **result.as_dict())
+
+
+def solve_batch(paths, source, options=None, workers=None):
+
+    '''Solves puzzle files in parallel, yielding each result as soon as it is ready.
+
+    :param paths: The puzzle file paths
+    :param source: The path of the word list every puzzle is filled from
+    :param options: The `SolveOptions` every puzzle is solved with
+    :param workers: The number of worker processes, by default one per core
+    :return: A generator of result dictionaries, in the order the puzzles finish
+    '''
+
+    # Compile the cache once up front, so the workers only have to map it
+    load_lexicon(source)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                initializer=start_worker,
+                                                initargs=(source,
+                                                          options or solver.SolveOptions()
+                                                          )) as pool:
+
+        futures = [pool.submit(solve_file, path) for path in paths]
+
+        for future in concurrent.futures.as_completed(futures):
+
+            yield future.result()
+
+
+def run_batch(path, source, options=None, workers=None, output=sys.stdout):
+
+    '''Solves every puzzle in a directory or manifest, writing one JSON line per puzzle.
+
+    :param path: The directory or manifest of puzzle files (see `find_puzzles()`)
+    :param source: The path of the word list every puzzle is filled from
+    :param options: The `SolveOptions` every puzzle is solved with
+    :param workers: The number of worker processes, by default one per core
+    :param output: The stream the JSON lines are written to
+    '''
+
+    for result in solve_batch(find_puzzles(path), source, options, workers):
+
+        output.write(json.dumps(result) + '\n')
+        output.flush()
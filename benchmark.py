@@ -0,0 +1,404 @@
+'''Reproducible benchmarks of the solver configurations on synthetic puzzles.'''
+
+import json
+import math
+import random
+import statistics
+import time
+import tracemalloc
+
+import utility
+
+from lexicon import from_words, read_words
+from portfolio import CONFIGURATIONS
+from solver import create_engine, solve
+
+BASELINE_PATH = 'benchmark_baseline.json'
+
+# Each case as (name, height, width, block density, lexicon size, seed, share of the cells
+# given as letters)
+SUITE = [
+    ('small-open', 5, 5, 0.15, 5000, 1, 0.0),
+    ('small-dense', 5, 5, 0.30, 2000, 2, 0.0),
+    ('medium', 7, 7, 0.25, 10000, 3, 0.0),
+    ('medium-sparse', 7, 7, 0.35, 21119, 4, 0.0),
+    ('large', 9, 9, 0.30, 21119, 5, 0.0),
+    ('large-given', 9, 9, 0.30, 21119, 5, 0.2),
+]
+
+# A run expanding more nodes or taking longer than this is given up, so one bad strategy
+# can't stall the suite
+MAX_NODES = 5000
+MAX_SECONDS = 2.0
+
+# How much slower than the baseline a median time may be before it is flagged
+TOLERANCE = 0.25
+
+def generate_grid(height, width, density, seed):
+
+    '''Generates an unfilled crossword with blocks placed at random.
+
+    Blocks are placed with rotational symmetry, as in published crosswords, and any cell
+    left outside every word space is blocked too. Every cell a word space starts on is
+    marked with '*'.
+
+    :param height: The number of rows
+    :param width: The number of columns
+    :param density: The share of cells to be blocked, between 0 and 1
+    :param seed: The seed of the random generator, so the same grid comes out every time
+    :return: The crossword as a list of row strings
+    '''
+
+    rng = random.Random(seed)
+    cells = [['_'] * width for _ in range(height)]
+
+    for i in range(height):
+
+        for j in range(width):
+
+            if (i, j) <= (height - 1 - i, width - 1 - j) and rng.random() < density:
+
+                cells[i][j] = cells[height - 1 - i][width - 1 - j] = '#'
+
+    def run(i, j, di, dj):
+
+        length = 1
+
+        for step in (-1, 1):
+
+            y, x = i + step * di, j + step * dj
+
+            while 0 <= y < height and 0 <= x < width and cells[y][x] != '#':
+
+                length += 1
+                y, x = y + step * di, x + step * dj
+
+        return length
+
+    # Blocking a cell can leave a neighbour stranded, so repeat until nothing changes
+    changed = True
+
+    while changed:
+
+        changed = False
+
+        for i in range(height):
+
+            for j in range(width):
+
+                if cells[i][j] != '#' and run(i, j, 0, 1) == 1 and run(i, j, 1, 0) == 1:
+
+                    cells[i][j] = '#'
+                    changed = True
+
+    for i in range(height):
+
+        for j in range(width):
+
+            if cells[i][j] == '#':
+
+                continue
+
+            starts_across = (j == 0 or cells[i][j-1] == '#') and run(i, j, 0, 1) > 1
+            starts_down = (i == 0 or cells[i-1][j] == '#') and run(i, j, 1, 0) > 1
+
+            if starts_across or starts_down:
+
+                cells[i][j] = '*'
+
+    return [''.join(row) for row in cells]
+
+
+def sample_lexicon(source, size, seed):
+
+    '''Builds a lexicon from a random sample of a word list.
+
+    :param source: The path of the word list, one word per line, plain or compressed
+    :param size: The number of words to sample, or at least as many as there are to take
+                 the whole list
+    :param seed: The seed of the random generator, so the same words come out every time
+    :return: The `Lexicon`
+    '''
+
+    words = sorted(set(read_words(source)))
+
+    if size < len(words):
+
+        words = random.Random(seed).sample(words, size)
+
+    return from_words(words)
+
+
+def give_letters(crossword, lexicon, share, seed):
+
+    '''Pre-fills some cells of a crossword with the letters of one of its fills.
+
+    The letters come from a fill found with the portfolio's 'mac' configuration, which
+    fills the suite's grids quickly, so the puzzle stays solvable.
+
+    :param crossword: The unfilled crossword as a list of row strings
+    :param lexicon: The `Lexicon` it is filled from
+    :param share: The share of the empty cells to be given, between 0 and 1
+    :param seed: The seed of the random generator, so the same cells come out every time
+    :return: The crossword with the letters given, or unchanged if it has no fill
+    '''
+
+    if share == 0:
+
+        return crossword
+
+    result = solve(crossword, lexicon, CONFIGURATIONS['mac'])
+
+    if not result.solved:
+
+        return crossword
+
+    rng = random.Random(seed)
+
+    return [''.join(letter if element in '_*' and rng.random() < share else element
+                    for element, letter in zip(row, filled))
+            for row, filled in zip(crossword, result.grid)]
+
+
+def check_fill(crossword, solution, lexicon):
+
+    '''Determines whether a fill is a real solution of a crossword.
+
+    :param crossword: The crossword that was filled, with any letters it was given
+    :param solution: The filled crossword as a list of row strings
+    :param lexicon: The `Lexicon` it was filled from
+    :return: True/False, whether the fill keeps every given letter and every word space
+             holds a different word of the lexicon
+    '''
+
+    for row, filled in zip(crossword, solution):
+
+        if any(element.isalpha() and element != letter
+               for element, letter in zip(row, filled)):
+
+            return False
+
+    words = []
+
+    for direction, (i, j), length in utility.find_runs(solution):
+
+        if direction == 'ACROSS':
+
+            words.append(solution[i][j:j + length])
+
+        else:
+
+            words.append(''.join(solution[i + k][j] for k in range(length)))
+
+    return (len(set(words)) == len(words)
+            and all(lexicon.word_id(word) is not None for word in words))
+
+
+def measure(crossword, lexicon, options, traced=False):
+
+    '''Solves a puzzle once, giving up after `MAX_NODES` nodes or `MAX_SECONDS` seconds.
+
+    :param crossword: The unfilled crossword as a list of row strings
+    :param lexicon: The `Lexicon` to fill it from
+    :param options: The `SolveOptions` to search with
+    :param traced: Whether to measure peak memory, which slows the run down
+    :return: A dictionary of the time, nodes, backtracks, whether the search finished,
+             whether it found a solution and whether that solution is valid (see
+             `check_fill()`), and the peak memory in bytes if traced
+    '''
+
+    solver = create_engine(options)
+
+    if traced:
+
+        tracemalloc.start()
+
+    start = time.perf_counter()
+
+    def budget(solver):
+
+        if solver.num_nodes > MAX_NODES or time.perf_counter() - start > MAX_SECONDS:
+
+            solver.stopped = True
+
+    solver.on_node = budget
+    grid = solver.setup(crossword, lexicon)
+
+    if grid is not None:
+
+        solver.solve(grid, 0)
+
+    elapsed = time.perf_counter() - start
+    sample = {'time': elapsed, 'nodes': solver.num_nodes, 'backtracks': solver.num_backtracks,
+              'finished': solver.solution is not None or not solver.stopped,
+              'solved': solver.solution is not None,
+              'valid': solver.solution is None or check_fill(crossword, solver.solution,
+                                                             lexicon)}
+
+    if traced:
+
+        sample['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return sample
+
+
+def percentile(values, share):
+
+    '''Returns the nearest-rank percentile of a list of values.
+
+    :param values: The values
+    :param share: The percentile as a share between 0 and 1, e.g. 0.95
+    :return: The smallest value at least `share` of the values are less than or equal to
+    '''
+
+    ordered = sorted(values)
+
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def run_suite(source='wordlists/hard_wordlist.txt', suite=None, configurations=None,
+              repeats=5, progress=None):
+
+    '''Runs every configuration on every case of the suite several times.
+
+    Every run of a case sees the same grid and lexicon, built from the case's seed. The
+    times are taken from untraced runs, and the peak memory from one extra traced run.
+
+    :param source: The path of the word list the lexicons are sampled from
+    :param suite: The cases to run, by default `SUITE`
+    :param configurations: A dictionary of name -> `SolveOptions`, by default the
+                           portfolio's `CONFIGURATIONS`
+    :param repeats: The number of timed runs of each configuration on each case
+    :param progress: An optional function called with the name of each result as it is
+                     finished
+    :return: A dictionary of 'case/configuration' -> the median and p95 time, nodes,
+             backtracks, peak memory and whether the run finished, solved the puzzle and
+             found a valid fill
+    '''
+
+    results = {}
+
+    for name, height, width, density, size, seed, share in suite or SUITE:
+
+        lexicon = sample_lexicon(source, size, seed)
+        crossword = give_letters(generate_grid(height, width, density, seed), lexicon,
+                                 share, seed)
+
+        for config, options in (configurations or CONFIGURATIONS).items():
+
+            samples = [measure(crossword, lexicon, options) for _ in range(repeats)]
+            traced = measure(crossword, lexicon, options, traced=True)
+            times = [sample['time'] for sample in samples]
+
+            key = f'{name}/{config}'
+            results[key] = {'median': statistics.median(times),
+                            'p95': percentile(times, 0.95),
+                            'nodes': samples[0]['nodes'],
+                            'backtracks': samples[0]['backtracks'],
+                            'peak_memory': traced['peak_memory'],
+                            'finished': samples[0]['finished'],
+                            'solved': samples[0]['solved'],
+                            'valid': samples[0]['valid']}
+
+            if progress is not None:
+
+                progress(key)
+
+    return results
+
+
+def save_baseline(results, path=BASELINE_PATH):
+
+    '''Writes benchmark results as the baseline later runs are compared with.
+
+    :param results: The results returned by `run_suite()`
+    :param path: The path of the baseline file
+    '''
+
+    with open(path, 'w') as baseline_file:
+
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+
+def load_baseline(path=BASELINE_PATH):
+
+    '''Reads the saved baseline.
+
+    :param path: The path of the baseline file
+    :return: The baseline results, or None if there is no baseline
+    '''
+
+    try:
+
+        with open(path, 'r') as baseline_file:
+
+            return json.load(baseline_file)
+
+    except OSError:
+
+        return None
+
+
+def regressions(results, baseline, tolerance=TOLERANCE):
+
+    '''Compares benchmark results with a baseline.
+
+    A result regressed if its fill isn't a valid solution, whatever the baseline says,
+    if its median time is more than `tolerance` slower than the baseline's, or if a search
+    that finished both times expanded more nodes, which means the search itself changed.
+
+    :param results: The results returned by `run_suite()`
+    :param baseline: The baseline results, or None to only check the fills
+    :param tolerance: The allowed slowdown as a share of the baseline's median, e.g. 0.25
+    :return: A list of `(key, message)` pairs, one per regression
+    '''
+
+    flagged = []
+
+    for key, result in results.items():
+
+        if not result['valid']:
+
+            flagged.append((key, 'the fill breaks a given letter or uses a non-word'))
+
+        before = (baseline or {}).get(key)
+
+        if before is None:
+
+            continue
+
+        if result['median'] > before['median'] * (1 + tolerance):
+
+            flagged.append((key, f"median {result['median']:.6f}s, baseline "
+                                 f"{before['median']:.6f}s"))
+
+        if result['finished'] and before['finished'] and result['nodes'] > before['nodes']:
+
+            flagged.append((key, f"{result['nodes']} nodes, baseline {before['nodes']}"))
+
+    return flagged
+
+
+def report(results):
+
+    '''Formats benchmark results as a table.
+
+    :param results: The results returned by `run_suite()`
+    :return: The table as a string
+    '''
+
+    lines = [f"{'case/configuration':<28} {'median':>10} {'p95':>10} {'nodes':>8} "
+             f"{'backtracks':>10} {'peak KiB':>9}  outcome"]
+
+    for key, result in results.items():
+
+        outcome = ('wrong fill' if not result['valid'] else
+                   'solved' if result['solved'] else
+                   'no solution' if result['finished'] else 'gave up')
+
+        lines.append(f"{key:<28} {result['median']:>10.6f} {result['p95']:>10.6f} "
+                     f"{result['nodes']:>8} {result['backtracks']:>10} "
+                     f"{result['peak_memory'] / 1024:>9.1f}  {outcome}")
+
+    return '\n'.join(lines)
@@ -0,0 +1,313 @@
+'''A content-addressed on-disk cache of solved crossword puzzles.'''
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import solver
+
+from grid import MARKERS
+from solver import SolveOptions, SolveResult
+
+CACHE_DIRECTORY = 'solution_cache'
+
+# How much the entries may take up on disk before the least recently used are evicted
+MAX_BYTES = 64 * 1024 * 1024
+
+# A lock file older than this was left by a process that died while evicting
+STALE_LOCK_SECONDS = 60
+
+# Bumped whenever a change to the search could change the solution stored under a key
+CACHE_VERSION = 1
+
+def normalize(grid):
+
+    '''Puts a crossword in the one form it is hashed in.
+
+    :param grid: The crossword, as a list of row strings or one string with a row per line
+    :return: The crossword as a list of row strings, without surrounding whitespace and
+             with every empty cell written '_'
+    '''
+
+    if isinstance(grid, str):
+
+        grid = grid.split()
+
+    return [row.strip().translate(MARKERS) for row in grid]
+
+
+def crop(crossword):
+
+    '''Cuts the fully blocked rows and columns off the edges of a crossword.
+
+    A region cut out of a puzzle (see `components.region()`) is then the same sub-grid
+    wherever it was in the puzzle, so it is cached once for every puzzle sharing it.
+
+    :param crossword: The crossword as a list of row strings
+    :return: The cropped crossword, and the row and column its top left cell was at
+    '''
+
+    rows = [i for i, row in enumerate(crossword) if row.strip('#')]
+    columns = [j for j in range(len(crossword[0]))
+               if any(row[j] != '#' for row in crossword)]
+
+    if not rows:
+
+        return crossword, 0, 0
+
+    top, bottom = rows[0], rows[-1] + 1
+    left, right = columns[0], columns[-1] + 1
+
+    return [row[left:right] for row in crossword[top:bottom]], top, left
+
+
+def uncrop(fill, crossword, top, left):
+
+    '''Puts a cropped fill back where it was cut from (see `crop()`).
+
+    :param fill: The filled, cropped crossword as a list of row strings
+    :param crossword: The crossword it was cropped from
+    :param top: The row the cropped crossword's top left cell was at
+    :param left: The column the cropped crossword's top left cell was at
+    :return: The fill at the size of the original crossword, blocked outside the crop
+    '''
+
+    width = len(crossword[0])
+    rows = ['#' * width] * len(crossword)
+
+    for i, row in enumerate(fill):
+
+        rows[top + i] = '#' * left + row + '#' * (width - left - len(row))
+
+    return rows
+
+
+def result_from_dict(entry):
+
+    '''Rebuilds a `SolveResult` from the dictionary returned by its `as_dict()`.
+
+    :param entry: The dictionary
+    :return: The `SolveResult`
+    '''
+
+    return SolveResult(entry['grid'], entry['elapsed'], entry['nodes'], entry['backtracks'],
+                       entry['backjumps'], entry['pruned'], entry.get('restarts', 0))
+
+
+class SolutionCache:
+
+    def __init__(self, directory=CACHE_DIRECTORY, max_bytes=MAX_BYTES):
+
+        '''Class keeps the results of solved puzzles on disk.
+
+        Each result is stored in its own JSON file, named after a hash of the normalized
+        grid, the words of the lexicon and the search strategies, so the same puzzle is
+        only ever searched once however it was submitted. Puzzles with no solution are
+        cached too.
+
+        Several processes may share a directory:
+
+        1. An entry is written to a temporary file and moved into place, so a reader sees
+        either the whole entry or none of it.
+
+        2. Reading an entry marks it as recently used by touching its modification time.
+
+        3. Once the entries take up more than `max_bytes`, the least recently used are
+        deleted. Only one process evicts at a time, and an entry deleted under a reader is
+        just a miss.
+
+        :param directory: The directory the entries are kept in, created if need be
+        :param max_bytes: How much the entries may take up on disk
+        '''
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+
+    def key(self, grid, lexicon, options=None):
+
+        '''Hashes everything the result of a search depends on.
+
+        :param grid: The unfilled crossword, as a list of row strings or one string with a
+                     row per line
+        :param lexicon: The `Lexicon` it is filled from
+        :param options: The `SolveOptions` it is searched with, by default `SolveOptions()`
+        :return: The key, as a hex digest
+        '''
+
+        options = options or SolveOptions()
+        content = {'version': CACHE_VERSION,
+                   'grid': normalize(grid),
+                   'lexicon': lexicon.digest(),
+                   'options': [options.ordering, options.propagation,
+                               bool(options.backjumping), options.value_ordering,
+                               options.fill]}
+
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+    def path(self, key):
+
+        '''Returns the path of an entry.
+
+        :param key: The key returned by `key()`
+        :return: The path of its file, which may not exist
+        '''
+
+        return os.path.join(self.directory, f'{key}.json')
+
+
+    def get(self, key):
+
+        '''Looks up a result.
+
+        :param key: The key returned by `key()`
+        :return: The stored `SolveResult`, or None if there is none
+        '''
+
+        path = self.path(key)
+
+        try:
+
+            with open(path, 'r') as entry_file:
+
+                entry = json.load(entry_file)
+
+            os.utime(path)
+
+        except (OSError, ValueError):
+
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return result_from_dict(entry)
+
+
+    def put(self, key, result):
+
+        '''Stores a result, evicting old entries if the cache has grown too big.
+
+        :param key: The key returned by `key()`
+        :param result: The `SolveResult` of a search that ran to the end
+        '''
+
+        descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+
+        with os.fdopen(descriptor, 'w') as entry_file:
+
+            json.dump(result.as_dict(), entry_file)
+
+        os.replace(temporary, self.path(key))
+        self.evict()
+
+
+    def evict(self):
+
+        '''Deletes the least recently used entries until the rest fit in `max_bytes`.
+
+        Does nothing if another process is already evicting. A lock left behind by a
+        process that died is cleared once it is `STALE_LOCK_SECONDS` old, so the next call
+        evicts again.
+        '''
+
+        lock = os.path.join(self.directory, '.lock')
+
+        # Creating the lock file fails if it exists, which works the same on every platform
+        try:
+
+            descriptor = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+
+        except FileExistsError:
+
+            try:
+
+                if time.time() - os.stat(lock).st_mtime > STALE_LOCK_SECONDS:
+
+                    os.remove(lock)
+
+            except OSError:
+
+                pass
+
+            return
+
+        except OSError:
+
+            return
+
+        try:
+
+            entries = []
+
+            for entry in os.scandir(self.directory):
+
+                if not entry.name.endswith('.json'):
+
+                    continue
+
+                try:
+
+                    stat = entry.stat()
+
+                except OSError:
+
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+
+            for _, size, path in sorted(entries):
+
+                if total <= self.max_bytes:
+
+                    break
+
+                try:
+
+                    os.remove(path)
+
+                except OSError:
+
+                    pass
+
+                total -= size
+
+        finally:
+
+            os.close(descriptor)
+            os.remove(lock)
+
+
+def cached_solve(grid, lexicon, options=None, cache=None):
+
+    '''Solves a crossword puzzle, unless the same puzzle has been solved before.
+
+    :param grid: The unfilled crossword, as a list of row strings or one string with a
+                 row per line
+    :param lexicon: A `Lexicon`, a list of words, or the path of a word list
+    :param options: The `SolveOptions` to search with, by default `SolveOptions()`
+    :param cache: The `SolutionCache`, by default one in `CACHE_DIRECTORY`
+    :return: A `SolveResult`, with the counters of the search that found it if it came
+             from the cache
+    '''
+
+    cache = cache or SolutionCache()
+    lexicon = solver.resolve_lexicon(lexicon)
+    key = cache.key(grid, lexicon, options)
+    result = cache.get(key)
+
+    if result is None:
+
+        result = solver.solve(grid, lexicon, options)
+        cache.put(key, result)
+
+    return result
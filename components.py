@@ -0,0 +1,251 @@
+'''Solving the independent regions of a crossword puzzle separately.'''
+
+import concurrent.futures
+import time
+
+import solver
+
+from cache import crop, uncrop
+from grid import MARKERS, Grid
+from puzzle import compile_slots
+from solver import SolveOptions, SolveResult
+
+def find_components(slots):
+
+    '''Groups the slots into regions that share no cells with each other.
+
+    :param slots: The compiled slots
+    :return: A list of regions, each a list of slots in the order they were found
+    '''
+
+    seen = set()
+    components = []
+
+    for slot in slots:
+
+        if slot.index in seen:
+
+            continue
+
+        seen.add(slot.index)
+        component = []
+        stack = [slot]
+
+        while stack:
+
+            current = stack.pop()
+            component.append(current)
+
+            for other, _, _ in current.crossings:
+
+                if other.index not in seen:
+
+                    seen.add(other.index)
+                    stack.append(other)
+
+        components.append(sorted(component, key=lambda slot: slot.index))
+
+    return components
+
+
+def region(crossword, component):
+
+    '''Cuts a region out of a crossword puzzle, blocking every cell outside it.
+
+    :param crossword: The unfilled crossword puzzle as a list of row strings
+    :param component: The slots of the region
+    :return: The region as a puzzle of its own, with the same size as the crossword
+    '''
+
+    width = len(crossword[0])
+    cells = {cell for slot in component for cell in slot.cells}
+
+    return [''.join(element if i * width + j in cells else '#'
+                    for j, element in enumerate(row))
+            for i, row in enumerate(crossword)]
+
+
+def combine(crossword, fills):
+
+    '''Overlays the filled regions of a crossword puzzle.
+
+    :param crossword: The unfilled crossword puzzle as a list of row strings
+    :param fills: The filled regions, each a list of row strings
+    :return: The filled crossword as a list of row strings
+    '''
+
+    rows = [list(row.translate(MARKERS)) for row in crossword]
+
+    for fill in fills:
+
+        for i, row in enumerate(fill):
+
+            for j, element in enumerate(row):
+
+                if element not in '#_':
+
+                    rows[i][j] = element
+
+    return [''.join(row) for row in rows]
+
+
+def words_in(fill, component):
+
+    '''Reads the words of a region off its fill.
+
+    :param fill: The filled region as a list of row strings
+    :param component: The slots of the region
+    :return: The list of words, one per slot
+    '''
+
+    cells = ''.join(fill)
+
+    return [''.join(cells[cell] for cell in slot.cells) for slot in component]
+
+
+def reconcile(regions, lexicon, options, index, used_words, fills, counters):
+
+    '''Fills the regions in turn so no word is used in two of them.
+
+    Each region is searched with the words of the regions before it already used. If it
+    can't be filled, the previous region moves on to its next solution.
+
+    :param regions: The regions as puzzles of their own (see `region()`)
+    :param lexicon: The `Lexicon` to fill them from
+    :param options: The `SolveOptions` to search with
+    :param index: The number of regions filled so far
+    :param used_words: The words used by the regions filled so far
+    :param fills: The list of fills of the regions so far, extended in place
+    :param counters: The node, backtrack, backjump and pruned counts, updated in place
+    :return: True/False, whether every remaining region could be filled
+    '''
+
+    if index == len(regions):
+
+        return True
+
+    engine, crossword = solver.prepare(regions[index], lexicon, options,
+                                       used_words=used_words)
+
+    try:
+
+        if crossword is None:
+
+            return False
+
+        for fill in engine.search(crossword, 0):
+
+            fills.append(list(fill))
+
+            if reconcile(regions, lexicon, options, index + 1,
+                         used_words + list(engine.assignment.values()), fills, counters):
+
+                return True
+
+            fills.pop()
+
+        return False
+
+    finally:
+
+        counters[:] = [counters[0] + engine.num_nodes, counters[1] + engine.num_backtracks,
+                       counters[2] + engine.num_backjumps, counters[3] + engine.num_pruned]
+
+
+def solve_components(grid, lexicon, options=None, workers=None, cache=None):
+
+    '''Solves a crossword puzzle one independent region at a time.
+
+    Regions that share no cells can only interact through the rule that no word is used
+    twice, so each is first solved on its own, optionally in parallel, and the search
+    costs the sum of the regions rather than their product. If the fills happen to repeat
+    a word, the regions are filled again in turn, each avoiding the words of the ones
+    before it (see `reconcile()`).
+
+    With a cache, each region is cropped to its own sub-grid (see `cache.crop()`) and its
+    result is looked up and stored under that, so a region shared by several puzzles,
+    down to the letters already in it, is only searched once.
+
+    :param grid: The unfilled crossword, as a list of row strings or one string with a
+                 row per line
+    :param lexicon: A `Lexicon`, a list of words, or the path of a word list
+    :param options: The `SolveOptions` to search with, by default `SolveOptions()`
+    :param workers: The number of processes the regions are first solved in, which needs
+                    `lexicon` to be a path. By default they are solved in this process
+    :param cache: An optional `SolutionCache` the fills of the regions are kept in
+    :return: A `SolveResult` with the counters summed over every region
+    '''
+
+    options = options or SolveOptions()
+
+    if isinstance(grid, str):
+
+        grid = grid.split()
+
+    start = time.perf_counter()
+    loaded = solver.resolve_lexicon(lexicon)
+    components = find_components(compile_slots(grid, Grid(grid), loaded))
+    regions = [region(grid, component) for component in components]
+    results = [None] * len(regions)
+    parts = regions
+
+    if cache is not None:
+
+        crops = [crop(part) for part in regions]
+        parts = [part for part, _, _ in crops]
+        keys = [cache.key(part, loaded, options) for part in parts]
+        results = [cache.get(key) for key in keys]
+
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    if workers and isinstance(lexicon, str) and len(missing) > 1:
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+
+            searched = list(pool.map(solver.solve, [parts[i] for i in missing],
+                                     [lexicon] * len(missing), [options] * len(missing)))
+
+    else:
+
+        searched = [solver.solve(parts[i], loaded, options) for i in missing]
+
+    for i, result in zip(missing, searched):
+
+        results[i] = result
+
+        if cache is not None:
+
+            cache.put(keys[i], result)
+
+    if cache is not None:
+
+        for result, part, (_, top, left) in zip(results, regions, crops):
+
+            if result.solved:
+
+                result.grid = uncrop(result.grid, part, top, left)
+
+    # Regions found in the cache cost no search
+    counters = [sum(result.nodes for result in searched),
+                sum(result.backtracks for result in searched),
+                sum(result.backjumps for result in searched),
+                sum(result.pruned for result in searched)]
+
+    # No region can be filled even on its own, so neither can the puzzle
+    if not all(result.solved for result in results):
+
+        return SolveResult(None, time.perf_counter() - start, *counters)
+
+    words = [word for result, component in zip(results, components)
+             for word in words_in(result.grid, component)]
+
+    if len(words) == len(set(words)):
+
+        return SolveResult(combine(grid, [result.grid for result in results]),
+                           time.perf_counter() - start, *counters)
+
+    fills = []
+    solved = reconcile(regions, loaded, options, 0, [], fills, counters)
+
+    return SolveResult(combine(grid, fills) if solved else None,
+                       time.perf_counter() - start, *counters)
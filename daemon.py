@@ -0,0 +1,642 @@
+'''A long-lived solver process answering JSON requests over a local socket.'''
+
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import statistics
+import time
+
+import solver
+
+from benchmark import percentile
+from lexicon import load_lexicon
+from solver import SolveOptions, SolveResult
+
+SOCKET_PATH = 'crossword_solver.sock'
+
+# The requests that may wait for a worker before new ones are turned away, per worker
+BACKLOG_PER_WORKER = 16
+
+# The keys of a request's "options" object, as accepted by `SolveOptions`
+OPTION_KEYS = ('ordering', 'propagation', 'backjumping', 'value_ordering', 'fill')
+
+def invalid_request(request):
+
+    '''Checks the fields of a solve request before it is queued.
+
+    :param request: The decoded request
+    :return: A description of what is wrong with it, or None if it can be queued
+    '''
+
+    grid = request.get('grid')
+    options = request.get('options')
+    deadline = request.get('deadline')
+
+    if isinstance(grid, str):
+
+        grid = grid.split()
+
+    if (not isinstance(grid, list) or not grid
+            or not all(isinstance(row, str) for row in grid)):
+
+        return "'grid' must be a list of row strings or one string with a row per line"
+
+    if any(len(row) != len(grid[0]) for row in grid) or not grid[0]:
+
+        return "The rows of 'grid' must all have the same, non-zero length"
+
+    if options is not None and not isinstance(options, dict):
+
+        return "'options' must be an object"
+
+    if deadline is not None and (isinstance(deadline, bool)
+                                 or not isinstance(deadline, (int, float))):
+
+        return "'deadline' must be a number of seconds"
+
+    return None
+
+
+def run_job(lexicon, job, cancelled):
+
+    '''Solves one request in a worker process.
+
+    :param lexicon: The worker's `Lexicon`
+    :param job: A dictionary of the 'grid', the 'options' and the 'deadline' as a
+                `time.time()` value, or None for no deadline
+    :param cancelled: The worker's shared flag, set by the daemon to stop the search
+    :return: The `SolveResult.as_dict()` of the search, with a 'status' of 'solved',
+             'unsolved' (there is no solution), 'timeout', 'cancelled' or 'error'
+    '''
+
+    start = time.perf_counter()
+    deadline = job['deadline']
+
+    try:
+
+        options = SolveOptions(**{key: value for key, value in job['options'].items()
+                                  if key in OPTION_KEYS})
+        engine, crossword = solver.prepare(job['grid'], lexicon, options)
+
+    except (ValueError, TypeError, IndexError, AttributeError) as error:
+
+        return {'status': 'error', 'error': str(error)}
+
+    def budget(engine):
+
+        if cancelled.value or deadline is not None and time.time() > deadline:
+
+            engine.stopped = True
+
+    engine.on_node = budget
+
+    if crossword is not None:
+
+        engine.solve(crossword, 0)
+
+    result = SolveResult(engine.solution, time.perf_counter() - start, engine.num_nodes,
+                         engine.num_backtracks, engine.num_backjumps,
+                         engine.num_pruned).as_dict()
+
+    if engine.solution is not None:
+
+        result['status'] = 'solved'
+
+    elif not engine.stopped:
+
+        result['status'] = 'unsolved'
+
+    else:
+
+        result['status'] = 'cancelled' if cancelled.value else 'timeout'
+
+    return result
+
+
+def serve_worker(connection, source, cancelled):
+
+    '''Runs jobs sent by the daemon until the connection is closed.
+
+    :param connection: The worker's end of the pipe to the daemon
+    :param source: The path of the word list, loaded once and kept for every job
+    :param cancelled: The worker's shared cancellation flag
+    '''
+
+    # Ctrl-C reaches the whole process group, but the daemon decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    lexicon = load_lexicon(source)
+
+    while True:
+
+        try:
+
+            job = connection.recv()
+
+        except EOFError:
+
+            return
+
+        if job is None:
+
+            return
+
+        connection.send(run_job(lexicon, job, cancelled))
+
+
+class Worker:
+
+    def __init__(self, context, source):
+
+        '''Class starts a worker process and holds the daemon's end of its pipe.
+
+        :param context: The multiprocessing context the process is started in
+        :param source: The path of the word list
+        '''
+
+        self.connection, child = context.Pipe()
+        self.cancelled = context.RawValue('b', 0)
+
+        self.process = context.Process(target=serve_worker,
+                                       args=(child, source, self.cancelled), daemon=True)
+        self.process.start()
+        child.close()
+
+
+    def stop(self):
+
+        '''Asks the worker process to exit, and waits for it.'''
+
+        try:
+
+            self.connection.send(None)
+
+        except OSError:
+
+            pass
+
+        self.process.join(timeout=1)
+
+        if self.process.is_alive():
+
+            self.process.terminate()
+
+
+class Daemon:
+
+    def __init__(self, source, workers=None, backlog=None):
+
+        '''Class answers solve requests from a pool of warm worker processes.
+
+        Every worker loads the word list once, memory-mapped from its compiled cache, so a
+        request only pays for compiling its grid and searching. Clients send one JSON
+        object per line and get one back per request, in the order they finish:
+
+        1. `{"id": ..., "grid": [...], "options": {...}, "deadline": seconds}` solves a
+        grid. The options are those of `SolveOptions` and the deadline counts from when
+        the request arrived, time spent waiting for a worker included.
+
+        2. `{"id": ..., "cancel": true}` stops a request sent earlier on the connection,
+        whether it is waiting or being searched. Closing the connection cancels them all.
+
+        Requests beyond `backlog` waiting for a worker are answered straight away with a
+        'busy' status, so a flood of requests can't build up an unbounded queue.
+
+        :param source: The path of the word list
+        :param workers: The number of worker processes, by default one per core
+        :param backlog: The number of requests that may wait, by default
+                        `BACKLOG_PER_WORKER` per worker
+        '''
+
+        self.source = source
+        self.num_workers = workers or multiprocessing.cpu_count()
+        self.backlog = backlog or BACKLOG_PER_WORKER * self.num_workers
+        self.workers = []
+        self.queue = None
+        self.context = None
+
+
+    async def serve(self, path=SOCKET_PATH, port=None, ready=None):
+
+        '''Starts the workers and answers requests until cancelled or sent SIGTERM.
+
+        :param path: The path of the Unix socket to listen on, if no port is given
+        :param port: The localhost TCP port to listen on instead
+        :param ready: An optional function called once requests are being accepted
+        '''
+
+        # Compile the cache once up front, so the workers only have to map it
+        load_lexicon(self.source)
+
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+
+        self.context = multiprocessing.get_context()
+        self.workers = [Worker(self.context, self.source) for _ in range(self.num_workers)]
+        self.queue = asyncio.Queue(maxsize=self.backlog)
+        dispatchers = [asyncio.create_task(self.dispatch(worker)) for worker in self.workers]
+
+        if port is not None:
+
+            server = await asyncio.start_server(self.handle, '127.0.0.1', port)
+
+        else:
+
+            if os.path.exists(path):
+
+                os.remove(path)
+
+            server = await asyncio.start_unix_server(self.handle, path)
+
+        try:
+
+            async with server:
+
+                if ready is not None:
+
+                    ready()
+
+                await server.serve_forever()
+
+        except asyncio.CancelledError:
+
+            pass
+
+        finally:
+
+            for dispatcher in dispatchers:
+
+                dispatcher.cancel()
+
+            for worker in self.workers:
+
+                worker.stop()
+
+            if port is None and os.path.exists(path):
+
+                os.remove(path)
+
+
+    async def handle(self, reader, writer):
+
+        '''Reads the requests of one client connection.
+
+        :param reader: The connection's `asyncio.StreamReader`
+        :param writer: The connection's `asyncio.StreamWriter`
+        '''
+
+        client = {'writer': writer, 'lock': asyncio.Lock(), 'jobs': {}}
+
+        try:
+
+            while True:
+
+                line = await reader.readline()
+
+                if not line:
+
+                    break
+
+                try:
+
+                    request = json.loads(line)
+                    request_id = request.get('id')
+
+                except (ValueError, AttributeError):
+
+                    await self.reply(client, {'id': None, 'status': 'error',
+                                              'error': 'Invalid JSON request'})
+                    continue
+
+                if request.get('cancel'):
+
+                    self.cancel(client, request_id)
+                    continue
+
+                error = invalid_request(request)
+
+                if error is not None:
+
+                    await self.reply(client, {'id': request_id, 'status': 'error',
+                                              'error': error})
+                    continue
+
+                deadline = request.get('deadline')
+                job = {'id': request_id,
+                       'grid': request.get('grid'),
+                       'options': request.get('options') or {},
+                       'deadline': time.time() + deadline if deadline is not None else None,
+                       'state': 'queued',
+                       'worker': None,
+                       'client': client}
+
+                try:
+
+                    self.queue.put_nowait(job)
+
+                except asyncio.QueueFull:
+
+                    await self.reply(client, {'id': request_id, 'status': 'busy'})
+                    continue
+
+                client['jobs'][request_id] = job
+
+        except ConnectionError:
+
+            pass
+
+        finally:
+
+            for request_id in list(client['jobs']):
+
+                self.cancel(client, request_id, notify=False)
+
+            writer.close()
+
+
+    def cancel(self, client, request_id, notify=True):
+
+        '''Cancels a client's request, whether it is waiting or being searched.
+
+        :param client: The client the request came from
+        :param request_id: The request's 'id'
+        :param notify: Whether the client is still there to be told
+        '''
+
+        job = client['jobs'].get(request_id)
+
+        if job is None:
+
+            return
+
+        if job['state'] == 'running':
+
+            # The worker's search stops at its next node and reports the cancellation
+            job['worker'].cancelled.value = 1
+
+        elif job['state'] == 'queued':
+
+            # Left in the queue, and skipped when it comes up
+            job['state'] = 'cancelled'
+            del client['jobs'][request_id]
+
+            if notify:
+
+                asyncio.ensure_future(self.reply(client, {'id': request_id,
+                                                          'status': 'cancelled'}))
+
+        if not notify:
+
+            job['client'] = None
+
+
+    async def dispatch(self, worker):
+
+        '''Feeds queued requests to one worker process, one at a time.
+
+        If the worker process dies, e.g. killed or out of memory, the request it was
+        solving is answered with an 'error' status and the worker is restarted, so the
+        pool keeps its size.
+
+        :param worker: The `Worker`
+        '''
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+
+            job = await self.queue.get()
+
+            if job['state'] == 'cancelled':
+
+                continue
+
+            if job['deadline'] is not None and time.time() > job['deadline']:
+
+                result = {'status': 'timeout'}
+
+            else:
+
+                job['state'] = 'running'
+                job['worker'] = worker
+                worker.cancelled.value = 0
+
+                try:
+
+                    worker.connection.send({'grid': job['grid'], 'options': job['options'],
+                                            'deadline': job['deadline']})
+
+                    # Wait for the response without blocking the other connections
+                    readable = loop.create_future()
+                    loop.add_reader(worker.connection.fileno(), readable.set_result, None)
+
+                    try:
+
+                        await readable
+
+                    finally:
+
+                        loop.remove_reader(worker.connection.fileno())
+
+                    result = worker.connection.recv()
+
+                except (EOFError, OSError):
+
+                    result = {'status': 'error',
+                              'error': 'The worker process died while solving the request'}
+                    worker = self.restart(worker)
+
+            job['state'] = 'done'
+            client = job['client']
+
+            if client is not None:
+
+                client['jobs'].pop(job['id'], None)
+                result['id'] = job['id']
+                await self.reply(client, result)
+
+
+    def restart(self, worker):
+
+        '''Replaces a worker process that died with a new one.
+
+        :param worker: The `Worker` whose process died
+        :return: The new `Worker`, which takes its place in `workers`
+        '''
+
+        worker.stop()
+        worker.connection.close()
+
+        replacement = Worker(self.context, self.source)
+        self.workers[self.workers.index(worker)] = replacement
+
+        return replacement
+
+
+    async def reply(self, client, message):
+
+        '''Sends a response to a client, one line of JSON.
+
+        :param client: The client to be answered
+        :param message: The response dictionary
+        '''
+
+        async with client['lock']:
+
+            try:
+
+                client['writer'].write((json.dumps(message) + '\n').encode())
+                await client['writer'].drain()
+
+            except ConnectionError:
+
+                pass
+
+
+async def connect(path=SOCKET_PATH, port=None):
+
+    '''Opens a connection to a running daemon.
+
+    :param path: The path of the daemon's Unix socket, if no port is given
+    :param port: The daemon's localhost TCP port
+    :return: The `(reader, writer)` pair of the connection
+    '''
+
+    if port is not None:
+
+        return await asyncio.open_connection('127.0.0.1', port)
+
+    return await asyncio.open_unix_connection(path)
+
+
+async def request(reader, writer, message):
+
+    '''Sends one request and waits for its response.
+
+    Only for connections with one request in flight at a time, as responses come back in
+    the order the requests finish.
+
+    :param reader: The connection's `asyncio.StreamReader`
+    :param writer: The connection's `asyncio.StreamWriter`
+    :param message: The request dictionary
+    :return: The response dictionary
+    '''
+
+    writer.write((json.dumps(message) + '\n').encode())
+    await writer.drain()
+
+    return json.loads(await reader.readline())
+
+
+def solve_remote(grid, options=None, deadline=None, path=SOCKET_PATH, port=None):
+
+    '''Solves a crossword puzzle with a running daemon.
+
+    :param grid: The unfilled crossword, as a list of row strings or one string with a
+                 row per line
+    :param options: The `SolveOptions` to search with, by default the daemon's default
+    :param deadline: The number of seconds to give up after, by default no limit
+    :param path: The path of the daemon's Unix socket, if no port is given
+    :param port: The daemon's localhost TCP port
+    :return: The response dictionary, with the 'status' and the fields of
+             `SolveResult.as_dict()`
+    '''
+
+    if isinstance(grid, str):
+
+        grid = grid.split()
+
+    message = {'id': 0, 'grid': grid, 'deadline': deadline,
+               'options': {key: getattr(options, key) for key in OPTION_KEYS}
+               if options is not None else {}}
+
+    async def run():
+
+        reader, writer = await connect(path, port)
+
+        try:
+
+            return await request(reader, writer, message)
+
+        finally:
+
+            writer.close()
+
+    return asyncio.run(run())
+
+
+def load_test(grid, options=None, requests=100, concurrency=8, deadline=None,
+              path=SOCKET_PATH, port=None):
+
+    '''Sends many requests to a running daemon from several concurrent clients.
+
+    Each client has its own connection and one request in flight at a time.
+
+    :param grid: The unfilled crossword every request solves
+    :param options: The `SolveOptions` to search with, by default the daemon's default
+    :param requests: The total number of requests
+    :param concurrency: The number of clients
+    :param deadline: The deadline of each request in seconds, by default no limit
+    :param path: The path of the daemon's Unix socket, if no port is given
+    :param port: The daemon's localhost TCP port
+    :return: A dictionary of the number of responses of each status, the throughput in
+             requests per second, and the median and p95 latency and search time
+    '''
+
+    if isinstance(grid, str):
+
+        grid = grid.split()
+
+    ids = itertools.count()
+    latencies = []
+    searches = []
+    statuses = {}
+
+    async def client():
+
+        reader, writer = await connect(path, port)
+
+        try:
+
+            while True:
+
+                request_id = next(ids)
+
+                if request_id >= requests:
+
+                    return
+
+                message = {'id': request_id, 'grid': grid, 'deadline': deadline,
+                           'options': {key: getattr(options, key) for key in OPTION_KEYS}
+                           if options is not None else {}}
+
+                started = time.perf_counter()
+                response = await request(reader, writer, message)
+                latencies.append(time.perf_counter() - started)
+                statuses[response['status']] = statuses.get(response['status'], 0) + 1
+
+                if 'elapsed' in response:
+
+                    searches.append(response['elapsed'])
+
+        finally:
+
+            writer.close()
+
+    async def run():
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    return {'statuses': statuses,
+            'throughput': len(latencies) / elapsed,
+            'median_latency': statistics.median(latencies),
+            'p95_latency': percentile(latencies, 0.95),
+            'median_search': statistics.median(searches) if searches else None,
+            'p95_search': percentile(searches, 0.95) if searches else None}
@@ -0,0 +1,173 @@
+'''A compact word graph (DAWG) answering which letters can extend a prefix.'''
+
+import array
+
+import numpy as np
+
+# Built graphs by lexicon digest, so every engine filling from the same words shares one
+graphs = {}
+
+class Dawg:
+
+    def __init__(self, matrices):
+
+        '''Class stores a word list as a minimal directed acyclic word graph.
+
+        The words are laid out as a trie, and identical subtrees are merged into one node,
+        so common suffixes such as '-ing' or '-tion' are stored once for the whole list
+        instead of once per word. Each length gets its own root, and since every path from
+        a root has the same length, reaching the end of a slot means a word was spelled.
+
+        A node is stored as two numbers:
+
+        1. `masks[node]`, a bitmask of the letters leaving the node, bit `n` for the `n`-th
+        letter of `alphabet`. The letters allowed in a cell are the AND of the masks of
+        the nodes its across and down prefixes reached.
+
+        2. `firsts[node]`, where its children start in `targets`. The child for a letter is
+        found by counting the mask's bits below the letter's bit, so no labels are stored.
+
+        The graph is built straight from the letter matrices, sorted as rows of bytes, so
+        no word is ever turned into a string.
+
+        :param matrices: The uint8 letter matrix of each word length, one row per word, as
+                         kept by a `Lexicon`. Duplicates are ignored
+        '''
+
+        codes = sorted(set().union(*(np.unique(matrix).tolist()
+                                     for matrix in matrices.values())))
+
+        self.alphabet = [chr(code) for code in codes]
+        self.bits = {letter: bit for bit, letter in enumerate(self.alphabet)}
+
+        # The bit of each letter code
+        bit_of = [0] * 256
+
+        for bit, code in enumerate(codes):
+
+            bit_of[code] = bit
+
+        # Node 0 ends every word: no letters leave it
+        self.masks = array.array('I' if len(self.alphabet) <= 32 else 'Q', [0])
+        self.firsts = array.array('I', [0])
+        self.targets = array.array('I')
+        self.roots = {}
+
+        register = {(): 0}
+
+        def build(rows, depth):
+
+            # The rows are sorted, so the words sharing a letter at `depth` are consecutive
+            column = rows[:, depth]
+            bounds = [0, len(rows)]
+
+            if len(rows) > 1:
+
+                bounds[1:1] = (np.flatnonzero(column[1:] != column[:-1]) + 1).tolist()
+
+            letters = column.tolist()
+            edges = []
+
+            for start, end in zip(bounds, bounds[1:]):
+
+                edges.append((bit_of[letters[start]],
+                              build(rows[start:end], depth + 1)
+                              if depth + 1 < rows.shape[1] else 0))
+
+            signature = tuple(edges)
+            node = register.get(signature)
+
+            if node is None:
+
+                node = len(self.masks)
+                register[signature] = node
+
+                mask = 0
+
+                for bit, _ in edges:
+
+                    mask |= 1 << bit
+
+                self.masks.append(mask)
+                self.firsts.append(len(self.targets))
+                self.targets.extend(target for _, target in edges)
+
+            return node
+
+        for length in sorted(matrices):
+
+            if len(matrices[length]) == 0:
+
+                continue
+
+            keys = np.unique(np.ascontiguousarray(matrices[length]).view(f'S{length}'))
+            self.roots[length] = build(keys.view(np.uint8).reshape(-1, length), 0)
+
+
+    def child(self, node, bit):
+
+        '''Follows the edge of a letter out of a node.
+
+        :param node: The node
+        :param bit: The letter's bit, which has to be set in the node's mask
+        :return: The node reached
+        '''
+
+        below = self.masks[node] & ((1 << bit) - 1)
+
+        return self.targets[self.firsts[node] + bin(below).count('1')]
+
+
+    def contains(self, word):
+
+        '''Determines whether a word is in the graph.
+
+        :param word: The word to be looked up
+        :return: True/False, whether the word was one of those the graph was built from
+        '''
+
+        node = self.roots.get(len(word))
+
+        if node is None:
+
+            return False
+
+        for letter in word:
+
+            bit = self.bits.get(letter)
+
+            if bit is None or not self.masks[node] >> bit & 1:
+
+                return False
+
+            node = self.child(node, bit)
+
+        return True
+
+
+    def nbytes(self):
+
+        '''Returns the memory the graph's arrays take up.
+
+        :return: The number of bytes
+        '''
+
+        return sum(table.itemsize * len(table)
+                   for table in (self.masks, self.firsts, self.targets))
+
+
+def graph_for(lexicon):
+
+    '''Builds the word graph of a lexicon, or returns the one already built.
+
+    :param lexicon: The `Lexicon`
+    :return: The `Dawg` of its words
+    '''
+
+    key = lexicon.digest()
+
+    if key not in graphs:
+
+        graphs[key] = Dawg(lexicon.matrices)
+
+    return graphs[key]
@@ -0,0 +1,1077 @@
+'''Backtracking search over the word spaces of a crossword puzzle.'''
+
+import heapq
+import time
+
+import numpy as np
+
+import utility
+
+from formats import load_grid
+from grid import EMPTY, Grid
+from lexicon import load_lexicon
+from nogoods import Nogoods
+from propagation import ac3, crossing_arcs, incoming_arcs
+from puzzle import compile_slots
+
+# Longer nogoods rarely match again, so they are not worth storing
+MAX_NOGOOD_SIZE = 3
+
+# The strategies each search decision can be made with (see `Engine`)
+ORDERINGS = ('static', 'degree', 'mrv')
+PROPAGATIONS = ('none', 'forward', 'mac')
+VALUE_ORDERINGS = ('lexicon', 'lcv')
+
+# How much of the search is printed: nothing, backtracks and propagation, or also the grid
+# at every node, which is slow enough to dominate the run time of small puzzles
+TRACE_OFF = 0
+TRACE_EVENTS = 1
+TRACE_GRIDS = 2
+
+class Engine:
+
+    def __init__(self, ordering='degree', propagation='forward', backjumping=False,
+                 value_ordering='lexicon', trace=TRACE_OFF, instrumentation=None, seed=None):
+
+        '''Class implements the search shared by every crossword puzzle solver.
+
+        Each decision the search makes is a pluggable strategy, chosen by name:
+
+        :param ordering: How the next word space is chosen. 'static' fills the slots in
+                         the order they appear in the grid, 'degree' in a fixed order
+                         sorted by degree, and 'mrv' picks the unfilled slot with the fewest
+                         remaining words at every step (see `select_slot()`)
+        :param propagation: How domains are pruned. 'none' tries every word of the right
+                            length and rejects those that don't fit as they come up,
+                            'forward' checks the slot about to be filled, and 'mac'
+                            maintains arc consistency over every crossing (see
+                            `propagation.ac3()`)
+        :param backjumping: Whether a failure jumps straight back to the most recent slot
+                            that caused it and is remembered as a nogood (see `solve()`)
+        :param value_ordering: The order words are tried in. 'lexicon' keeps word list
+                               order, 'lcv' tries the least constraining words first (see
+                               `least_constraining()`)
+        :param trace: How much of the search is printed, `TRACE_OFF`, `TRACE_EVENTS` or
+                      `TRACE_GRIDS`
+        :param instrumentation: An optional `Instrumentation` counting what the search
+                                does in each slot
+        :param seed: If given, ties between equally good slots are broken at random and
+                     the words of each slot are tried in a random order (or, with 'lcv',
+                     equally constraining words are), so that restarts explore a
+                     different part of the tree each time
+        '''
+
+        for name, value, choices in (('ordering', ordering, ORDERINGS),
+                                     ('propagation', propagation, PROPAGATIONS),
+                                     ('value ordering', value_ordering, VALUE_ORDERINGS)):
+
+            if value not in choices:
+
+                raise ValueError(f'Unknown {name} {value!r}, expected one of {choices}')
+
+        if ordering == 'mrv' and propagation == 'none':
+
+            raise ValueError("'mrv' ordering needs domains, so it can't be used with 'none'")
+
+        self.ordering = ordering
+        self.propagation = propagation
+        self.backjumping = backjumping
+        self.value_ordering = value_ordering
+        self.trace = trace
+        self.instrumentation = instrumentation
+        self.random = np.random.default_rng(seed) if seed is not None else None
+        self.num_nodes = 0
+        self.num_backtracks = 0
+        self.num_backjumps = 0
+        self.num_pruned = 0
+        self.start_time = time.time()
+
+        self.slots = []
+        self.solution = None
+        self.stopped = False
+
+        # Each open level of the search as [slot, words, position tried, inconclusive, length
+        # of the grid's trail when it was opened], and an optional function called as
+        # `on_node(self)` on every node, which may set `stopped`
+        self.frames = []
+        self.on_node = None
+
+        # Domains are only maintained across the search when a strategy needs them
+        self.tracking = ordering == 'mrv' or propagation == 'mac'
+        self.domains = []
+        self.sizes = []
+        self.filled = []
+        self.queue = []
+        self.trail = []
+
+        # The rank of each slot among slots that are otherwise equally good to fill next
+        self.ranks = []
+
+        # The word placed in each filled slot, by `slot.index`, the words in use by length
+        # (see `assign()`) and the slots of each length, and what was learned
+        self.assignment = {}
+        self.used = {}
+        self.peers = {}
+        self.nogoods = Nogoods()
+        self.wiped_out = None
+
+        # What `setup()` left behind, for `reset()`: the slot order, the words that may not
+        # be placed and the length of the domain trail
+        self.order = []
+        self.excluded = {}
+        self.base = 0
+
+
+    def run(self, crossword_path, source):
+
+        '''Solves a crossword puzzle file and prints the outcome.
+
+        Using the crossword puzzle and word list read in, each word space in the crossword
+        puzzle is compiled into a `Slot` (see `puzzle.compile_slots()`). Attributes include:
+
+        1. Whether the word space is across or down.
+
+        2. The cells the word space covers, starting at the current `i` and `j`.
+
+        3. The words valid for the particular word space (i.e. words that equal the length of
+        the word space). Ex:
+
+                len('HOSES') = 5
+                utility.find_runs(...) -> [('ACROSS', (i, j), 5), ...]
+
+        4. The word spaces it crosses, and at which letter positions.
+
+        :param crossword_path: The path of the crossword puzzle file
+        :param source: The path of the word list
+        '''
+
+        # Loading the word list through its compiled cache, and the crossword in any format
+        # with its letters in the case of the word list
+        lexicon = load_lexicon(source)
+        crossword = load_grid(crossword_path, lexicon.letter_case())
+
+        grid = self.setup(crossword, lexicon)
+
+        if grid is not None:
+
+            self.solve(grid, 0)
+
+        if self.solution is None:
+
+            print(f'''
+-- No solution found after {time.time() - self.start_time} seconds --
+''')
+            return
+
+        utility.print_puzzle(self.solution)
+
+        print(f'''
+-- Puzzle solved after {time.time() - self.start_time} seconds --
+
+Number of backtracks: {self.num_backtracks}
+
+Number of backjumps: {self.num_backjumps}
+
+Number of words pruned: {self.num_pruned}
+''')
+
+
+    def setup(self, crossword, lexicon, used_words=()):
+
+        '''Compiles a crossword puzzle and prepares the domains for searching.
+
+        :param crossword: The unfilled crossword puzzle as a list of row strings
+        :param lexicon: The `Lexicon` to fill it from, which can be shared between puzzles
+        :param used_words: Words that may not be placed, e.g. because another part of the
+                           grid already uses them
+        :return: The `Grid` to be passed to `solve()`, or None if propagation already
+                 shows the puzzle has no solution
+        '''
+
+        self.lexicon = lexicon
+
+        grid = Grid(crossword)
+        self.slots = compile_slots(crossword, grid, self.lexicon)
+
+        if self.instrumentation is not None:
+
+            self.instrumentation.attach(self.slots)
+
+        self.used = {}
+        self.peers = {}
+
+        for slot in self.slots:
+
+            self.used.setdefault(slot.length, set())
+            self.peers.setdefault(slot.length, []).append(slot)
+
+        for word in used_words:
+
+            if len(word) in self.used:
+
+                self.used[len(word)].add(word)
+
+        if self.random is None:
+
+            self.ranks = list(range(len(self.slots)))
+
+        else:
+
+            self.ranks = self.random.permutation(len(self.slots)).tolist()
+
+        if self.ordering != 'static':
+
+            self.degree_heuristic()
+
+        if self.tracking:
+
+            # Indexed by `slot.index`, which is unaffected by the degree sort. Each domain
+            # starts from the words agreeing with any letters the grid was given
+            self.domains = [None] * len(self.slots)
+
+            for slot in self.slots:
+
+                domain = self.lexicon.candidates(slot.length, grid.pattern(slot.cells))
+
+                for word in self.used[slot.length]:
+
+                    domain = self.lexicon.discard(domain, word)
+
+                self.domains[slot.index] = domain
+
+            self.sizes = [self.lexicon.size(domain) for domain in self.domains]
+            self.filled = [False] * len(self.slots)
+            self.rebuild_queue()
+
+        if self.propagation == 'mac':
+
+            pruned = ac3(self.lexicon, self.domains, crossing_arcs(self.slots),
+                         self.update)
+
+            if pruned is None:
+
+                return None
+
+            if self.trace >= TRACE_EVENTS:
+
+                print(f'=> AC-3 pruned {pruned} words before searching')
+
+            self.num_pruned += pruned
+
+        # More slots of one length than words left to go around them
+        if self.tracking and not self.pigeonhole():
+
+            return None
+
+        self.order = list(self.slots)
+        self.excluded = {length: set(words) for length, words in self.used.items()}
+        self.base = len(self.trail)
+
+        return grid
+
+
+    def reset(self, crossword):
+
+        '''Puts the engine and its grid back to the state `setup()` left them in.
+
+        The words placed since are emptied from the grid and the domains are restored
+        from the trail, so the same puzzle can be searched again, e.g. with other words
+        kept, without compiling the slots or rebuilding the domains. The counters and the
+        learned nogoods start over.
+
+        :param crossword: The `Grid` returned by `setup()`
+        '''
+
+        crossword.undo(0)
+
+        while len(self.trail) > self.base:
+
+            slot, domain, size = self.trail.pop()
+
+            self.domains[slot.index] = domain
+            self.sizes[slot.index] = size
+
+        self.slots = list(self.order)
+        self.used = {length: set(words) for length, words in self.excluded.items()}
+        self.assignment = {}
+        self.nogoods = Nogoods()
+        self.frames = []
+        self.solution = None
+        self.stopped = False
+        self.on_node = None
+        self.wiped_out = None
+        self.num_nodes = self.num_backtracks = self.num_backjumps = self.num_pruned = 0
+        self.start_time = time.time()
+
+        if self.tracking:
+
+            self.filled = [False] * len(self.slots)
+            self.rebuild_queue()
+
+
+    def exclude(self, words):
+
+        '''Keeps words from being placed, after `setup()` has run.
+
+        The words are removed from the domains through `update()`, so `reset()` lets them
+        back in. With 'mac' propagation, AC-3 is run from the slots that lost a word.
+
+        :param words: The words that may not be placed
+        :return: True/False, whether every domain still has at least one word, and the
+                 slots of each length can still be given different words
+        '''
+
+        changed = []
+
+        for word in words:
+
+            if len(word) not in self.used:
+
+                continue
+
+            self.used[len(word)].add(word)
+
+            if not self.tracking:
+
+                continue
+
+            word_id = self.lexicon.word_id(word)
+
+            for slot in self.peers[len(word)]:
+
+                domain = self.domains[slot.index]
+                narrowed = self.lexicon.discard_id(domain, word_id)
+
+                if narrowed is not domain:
+
+                    self.update(slot, narrowed)
+                    changed.append(slot)
+
+                    if self.lexicon.size(narrowed) == 0:
+
+                        return False
+
+        if not self.tracking:
+
+            return True
+
+        if self.propagation == 'mac' and changed:
+
+            arcs = []
+
+            for slot in changed:
+
+                arcs += incoming_arcs(slot)
+
+            pruned = ac3(self.lexicon, self.domains, arcs, self.update)
+
+            if pruned is None:
+
+                return False
+
+            self.num_pruned += pruned
+
+        return self.pigeonhole()
+
+
+    def degree_heuristic(self):
+
+        '''Sorts the word spaces by their number of constraints.
+
+        A word space's degree is the number of other word spaces crossing it, which is
+        known from the crossing table built when the slots were compiled. The slots are
+        sorted from greatest to least degree.
+
+        By sorting in this manner, the word space with the most constraints is filled in
+        first, which could save us from backtracking later. Slots of equal degree keep the
+        order they were found in, unless ties are broken at random.
+        '''
+
+        self.slots.sort(key=lambda slot: (-slot.degree, self.ranks[slot.index]))
+
+
+    def rebuild_queue(self):
+
+        '''Rebuilds the priority queue of unfilled slots from the current domain sizes.
+
+        Queue entries are `(domain size, -degree, rank, slot)`, so the slot with the fewest
+        remaining words comes first and ties go to the slot with the most constraints, then
+        to the slot with the lowest rank.
+        '''
+
+        self.queue = [(self.sizes[slot.index], -slot.degree, self.ranks[slot.index], slot)
+                      for slot in self.slots if not self.filled[slot.index]]
+
+        heapq.heapify(self.queue)
+
+
+    def select_slot(self, slot_index):
+
+        '''Chooses the slot to be filled next.
+
+        With 'static' or 'degree' ordering this is simply the next slot in the list. With 'mrv'
+        ordering it is the unfilled slot with the smallest remaining domain. Entries are
+        pushed onto the queue whenever a domain changes and old entries are left behind;
+        an entry is only trusted if its slot is unfilled and its size is still current.
+
+        :param slot_index: The number of slots filled so far
+        :return: The slot to be filled next
+        '''
+
+        if self.ordering != 'mrv':
+
+            return self.slots[slot_index]
+
+        # Stale entries pile up as domains shrink and grow back, so clear them out
+        if len(self.queue) > 4 * len(self.slots):
+
+            self.rebuild_queue()
+
+        while True:
+
+            size, _, _, slot = self.queue[0]
+
+            if not self.filled[slot.index] and size == self.sizes[slot.index]:
+
+                return slot
+
+            heapq.heappop(self.queue)
+
+
+    def update(self, slot, domain):
+
+        '''Replaces a slot's domain, recording the old one on the trail.
+
+        :param slot: The slot whose domain changed
+        :param domain: The new array of word IDs
+        '''
+
+        self.trail.append((slot, self.domains[slot.index], self.sizes[slot.index]))
+
+        size = self.lexicon.size(domain)
+
+        # A filled slot's domain collapsing to its own word isn't pruning
+        if self.instrumentation is not None and not self.filled[slot.index]:
+
+            self.instrumentation.prune(slot, self.sizes[slot.index] - size)
+
+        self.domains[slot.index] = domain
+        self.sizes[slot.index] = size
+
+        if self.ordering == 'mrv':
+
+            heapq.heappush(self.queue, (self.sizes[slot.index], -slot.degree,
+                                        self.ranks[slot.index], slot))
+
+
+    def assign(self, slot, word):
+
+        '''Records a newly placed word and propagates it to the domains of the other slots.
+
+        No word may be used twice, so the word is removed from the domains of the other
+        unfilled slots of its length (see `all_different()`). With 'forward' propagation
+        the unfilled slots crossing the word are then narrowed to the words agreeing with
+        it. With 'mac' propagation the slot's domain becomes the word alone and AC-3 is run
+        from every arc pointing at it or at a slot that lost the word.
+
+        :param slot: The slot the word was placed in
+        :param word: The word that was placed
+        :return: True/False, whether every domain still has at least one word, and the
+                 slots of each length can still be given different words
+        '''
+
+        self.assignment[slot.index] = word
+        self.used[slot.length].add(word)
+
+        if not self.tracking:
+
+            return True
+
+        self.filled[slot.index] = True
+        changed = self.all_different(slot, word)
+
+        if changed is None:
+
+            return False
+
+        if self.propagation == 'mac':
+
+            self.update(slot, self.lexicon.singleton(word))
+
+            arcs = incoming_arcs(slot)
+
+            for other in changed:
+
+                arcs += incoming_arcs(other)
+
+            pruned = ac3(self.lexicon, self.domains, arcs, self.update)
+
+            if pruned is None:
+
+                # The wipeout may have come from anywhere in the chain of revisions
+                self.wiped_out = None
+                return False
+
+            if self.trace >= TRACE_EVENTS:
+
+                print(f'=> AC-3 pruned {pruned} words')
+
+            self.num_pruned += pruned
+
+            return self.pigeonhole()
+
+        for other, position, other_position in slot.crossings:
+
+            if self.filled[other.index]:
+
+                continue
+
+            domain = self.domains[other.index]
+            narrowed = self.lexicon.restrict(domain, other.length, other_position,
+                                             word[position])
+
+            if self.lexicon.size(narrowed) != self.lexicon.size(domain):
+
+                self.update(other, narrowed)
+
+                if self.lexicon.size(narrowed) == 0:
+
+                    self.wiped_out = other
+                    return False
+
+        return self.pigeonhole()
+
+
+    def all_different(self, slot, word):
+
+        '''Removes a placed word from the domains of the other unfilled slots of its length.
+
+        :param slot: The slot the word was placed in
+        :param word: The word that was placed
+        :return: The list of slots whose domains lost the word, or None if one of them has
+                 no words left
+        '''
+
+        changed = []
+        word_id = self.lexicon.word_id(word)
+
+        for other in self.peers[slot.length]:
+
+            if other is slot or self.filled[other.index]:
+
+                continue
+
+            domain = self.domains[other.index]
+            narrowed = self.lexicon.discard_id(domain, word_id)
+
+            if narrowed is not domain:
+
+                self.update(other, narrowed)
+
+                if self.lexicon.size(narrowed) == 0:
+
+                    self.wiped_out = other
+                    return None
+
+                changed.append(other)
+
+        return changed
+
+
+    def pigeonhole(self):
+
+        '''Cheaply checks that the unfilled slots of each length can still all get different
+        words.
+
+        Any k of them need at least k different words between their domains (Hall's
+        condition). Checking every subset, or matching slots to words, costs too much to
+        do after each placed word, so only the k slots with the smallest domains are
+        checked for each k, and only while those domains have fewer words than there are
+        unfilled slots. This is a partial check: it never fails a length that can still
+        be filled, but a violation among slots that aren't the k smallest goes unnoticed
+        until the search runs into it. A failure blames every filled slot.
+
+        :return: True/False, whether every length passes the check
+        '''
+
+        for slots in self.peers.values():
+
+            unfilled = [slot for slot in slots if not self.filled[slot.index]]
+            small = sorted((slot for slot in unfilled
+                            if self.sizes[slot.index] < len(unfilled)),
+                           key=lambda slot: self.sizes[slot.index])
+            words = set()
+
+            for k, slot in enumerate(small, 1):
+
+                words.update(self.domains[slot.index].tolist())
+
+                if len(words) < k:
+
+                    self.wiped_out = None
+                    return False
+
+        return True
+
+
+    def unassign(self, slot, mark):
+
+        '''Forgets a slot's word, restores the domains changed since a trail mark and makes
+        the slot selectable.
+
+        :param slot: The slot the word is being removed from
+        :param mark: The length of the domain trail before the word was assigned
+        '''
+
+        self.used[slot.length].discard(self.assignment.pop(slot.index))
+
+        if not self.tracking:
+
+            return
+
+        while len(self.trail) > mark:
+
+            other, domain, size = self.trail.pop()
+
+            self.domains[other.index] = domain
+            self.sizes[other.index] = size
+
+            if self.ordering == 'mrv':
+
+                heapq.heappush(self.queue, (size, -other.degree, self.ranks[other.index],
+                                            other))
+
+        self.filled[slot.index] = False
+
+        if self.ordering == 'mrv':
+
+            heapq.heappush(self.queue, (self.sizes[slot.index], -slot.degree,
+                                        self.ranks[slot.index], slot))
+
+
+    def conflicts(self, slot):
+
+        '''Finds the filled slots responsible for the words missing from a slot's domain.
+
+        With forward checking a domain only loses words to the letters of crossing words
+        and to words already used, so the culprits are the filled crossing slots and the
+        filled slots of the same length. With 'mac' propagation removals can travel along
+        chains of crossings, so every filled slot is blamed.
+
+        :param slot: The slot whose domain was narrowed
+        :return: The set of `slot.index` values of the responsible slots
+        '''
+
+        if self.propagation == 'mac':
+
+            return set(self.assignment) - {slot.index}
+
+        conflicts = {other.index for other, _, _ in slot.crossings
+                     if other.index in self.assignment}
+
+        for index, word in self.assignment.items():
+
+            if len(word) == slot.length and index != slot.index:
+
+                conflicts.add(index)
+
+        return conflicts
+
+
+    def violated_nogood(self, slot, word):
+
+        '''Looks for a learned nogood that placing a word would complete.
+
+        :param slot: The slot the word would be placed in
+        :param word: The word to be placed
+        :return: The nogood, a frozenset of `(slot index, word)` pairs, or None
+        '''
+
+        return self.nogoods.find(slot.index, word, self.assignment)
+
+
+    def learn(self, conflicts):
+
+        '''Stores the words currently in the conflicting slots as a nogood.
+
+        Once every word for a slot has failed, the words in the slots it blamed can never
+        appear together in a solution. The nogood is stored (see `nogoods.Nogoods`), so it
+        is found again in any branch that repeats the combination.
+
+        With a fixed slot order, a nogood over the first slots of the order is skipped: the
+        search visits each combination of their words once, so it can never come up again.
+        Restarts share nogoods between attempts with different orders, so with a seed every
+        nogood is kept.
+
+        :param conflicts: The set of `slot.index` values blamed for the failure
+        '''
+
+        if not 0 < len(conflicts) <= MAX_NOGOOD_SIZE:
+
+            return
+
+        if (self.ordering != 'mrv' and self.random is None
+                and all(self.slots[i].index in conflicts for i in range(len(conflicts)))):
+
+            return
+
+        self.nogoods.add(frozenset((index, self.assignment[index]) for index in conflicts))
+
+
+    def completion_check(self, crossword):
+
+        '''Checks whether every slot has a word. If so, the solution is recorded.
+
+        The grid can run out of empty cells before then, when the words of a slot were all
+        written by the slots crossing it, but those letters still have to be checked as a
+        word of their own.
+
+        :param crossword: The crossword state to be checked for completion
+        :return: True/False, whether the crossword is complete
+        '''
+
+        if len(self.assignment) == len(self.slots):
+
+            self.solution = list(crossword)
+            self.stopped = True
+            return True
+
+        return False
+
+
+    def forward_check(self, crossword, slot):
+
+        '''Forward checks ahead of time removing unviable words from the domain.
+
+        The letters already on the current path are read off the grid as a pattern such as
+        'a__l_'. The lexicon's positional index gives the words with one of those letters,
+        and they are filtered against the rest of the pattern with one comparison over the
+        letter matrix. Words already used are then removed from the result, unless the
+        domain is tracked, in which case `assign()` already removed them.
+
+        :param crossword: The grid being filled
+        :param slot: The current slot we are on
+        :return: The words in the slot's domain that are satisfiable
+        '''
+
+        if self.propagation == 'none':
+
+            # Nothing is filtered ahead of time, `rejects()` skips words as they come up
+            if self.value_ordering == 'lcv':
+
+                return self.least_constraining(crossword, slot,
+                                               self.shuffled(self.lexicon.full_domain(
+                                                   slot.length)))
+
+            # Copied, as untried words may be cut from the end of the list (see `solve()`)
+            words = list(slot.domain)
+
+            if self.random is not None:
+
+                self.random.shuffle(words)
+
+            return words
+
+        if self.tracking:
+
+            # Already narrowed by `assign()` as the crossing and same-length words were placed
+            domain = self.domains[slot.index]
+
+        else:
+
+            domain = self.lexicon.candidates(slot.length, crossword.pattern(slot.cells))
+
+            for word in self.used[slot.length]:
+
+                domain = self.lexicon.discard(domain, word)
+
+        if self.instrumentation is not None and not self.tracking:
+
+            # Without tracked domains, forward checking prunes from the whole length bucket
+            self.instrumentation.prune(slot, len(slot.domain) - self.lexicon.size(domain))
+
+        if self.value_ordering == 'lcv':
+
+            return self.least_constraining(crossword, slot, self.shuffled(domain))
+
+        return self.lexicon.words(slot.length, self.shuffled(domain))
+
+
+    def shuffled(self, domain):
+
+        '''Puts a domain in random order when ties are broken at random.
+
+        `least_constraining()` sorts stably, so this also breaks its ties at random.
+
+        :param domain: The array of word IDs
+        :return: The domain, shuffled if the engine was given a seed
+        '''
+
+        if self.random is None:
+
+            return domain
+
+        return self.random.permutation(domain)
+
+
+    def rejects(self, crossword, slot, word):
+
+        '''Determines whether a word from `forward_check()` must still be skipped.
+
+        Only needed without propagation, where the words of a slot are not filtered ahead
+        of time and are instead checked one by one as the search reaches them.
+
+        :param crossword: The grid being filled
+        :param slot: The current slot we are on
+        :param word: The word about to be placed
+        :return: True/False, whether the word is already used or doesn't fit
+        '''
+
+        if self.propagation != 'none':
+
+            return False
+
+        # If a filled cell in the word space does not match the word, skip it
+        return word in self.used[slot.length] or not crossword.fits(slot.cells, word)
+
+
+    def least_constraining(self, crossword, slot, domain):
+
+        '''Orders a domain so the words leaving the most options for crossing slots are first.
+
+        For every crossing cell that is still empty, each candidate is scored by how many
+        words of the crossing slot's length have the candidate's letter at the crossing
+        position, looked up in the lexicon's letter frequency tables. The scores of all
+        candidates are computed at once from the lexicon's letter matrix, and the log
+        counts are summed, so a word is ranked by the product of the options it leaves.
+
+        :param crossword: The grid being filled
+        :param slot: The current slot we are on
+        :param domain: The array of word IDs to be ordered
+        :return: The words of the domain, least constraining first
+        '''
+
+        letters = self.lexicon.matrix(slot.length)[domain]
+        scores = np.zeros(len(domain))
+
+        for other, position, other_position in slot.crossings:
+
+            # Every candidate agrees with a letter already on the board, so skip it
+            if crossword.cells[slot.cells[position]] != EMPTY:
+
+                continue
+
+            counts = self.lexicon.frequency(other.length)[other_position]
+
+            # A letter no crossing word has there scores -inf and goes to the back
+            with np.errstate(divide='ignore'):
+
+                scores += np.log(counts[letters[:, position]])
+
+        bucket = self.lexicon.words_of_length(slot.length)
+
+        return [bucket[i] for i in domain[np.argsort(-scores, kind='stable')].tolist()]
+
+
+    def solve(self, crossword, slot_index):
+
+        '''Solves the crossword puzzle, stopping at the first solution.
+
+        The first grid produced by `search()` is recorded in `solution` and the search is
+        abandoned, which leaves the filled grid as it is.
+
+        :param crossword: The grid being filled in place
+        :param slot_index: The number of slots filled so far
+        '''
+
+        for _ in self.search(crossword, slot_index):
+
+            self.completion_check(crossword)
+            return
+
+
+    def search(self, crossword, slot_index):
+
+        '''Searches for every solution of the crossword puzzle.
+
+        This function solves the crossword puzzle by using recursion and backtracking. If
+        there is a possible move, it will be made and the word recorded as used (see
+        `assign()`), so duplication does not occur.
+
+        If the move leads nowhere, it is undone in place: the grid empties the cells the
+        word filled (and only those) via `Grid.undo()`, and the next word is tried. The
+        search unwinds without undoing anything once `stopped` is set, either by the caller
+        or because `on_node` asked it to stop.
+
+        This is a generator: it yields the grid itself, not a copy, each time every slot
+        has a word, and carries on from there when resumed. Nothing is built for a solution
+        the caller doesn't copy, and memory stays bounded by the depth of the search.
+
+        With backjumping, every failure returns its conflict set: the filled slots whose
+        words caused it. A slot that is not in the conflict set of the word it just tried
+        could not have changed the outcome, so it returns straight away and the search
+        jumps back to the most recent slot that could. Once every word of a slot fails,
+        the conflict set is stored as a nogood (see `learn()`).
+
+        :param crossword: The grid being filled in place
+        :param slot_index: The number of slots filled so far
+        :return: A generator of the filled grid, whose return value is the conflict set of
+                 the failure, when backjumping
+        '''
+
+        if self.trace >= TRACE_GRIDS:
+
+            utility.print_puzzle(crossword)
+
+        self.num_nodes += 1
+
+        if len(self.assignment) == len(self.slots):
+
+            # Nothing above a solution failed, so nothing there can be learned as a nogood
+            for frame in self.frames:
+
+                frame[3] = True
+
+            yield crossword
+
+            return set(self.assignment)
+
+        if self.on_node is not None:
+
+            self.on_node(self)
+
+            if self.stopped:
+
+                return None
+
+        slot = self.select_slot(slot_index)
+        stats = self.instrumentation
+
+        if stats is None:
+
+            domain = self.forward_check(crossword, slot)
+
+        else:
+
+            started = time.perf_counter()
+            domain = self.forward_check(crossword, slot)
+            stats.node(slot, time.perf_counter() - started)
+
+        # The untried words at the end of `domain` may be handed off by `on_node`
+        frame = [slot, domain, 0, False, len(crossword.trail)]
+        self.frames.append(frame)
+
+        if self.backjumping:
+
+            conflicts = self.conflicts(slot)
+
+        for position, word in enumerate(domain):
+
+            frame[2] = position
+
+            if self.rejects(crossword, slot, word):
+
+                if stats is not None:
+
+                    stats.reject(slot)
+
+                continue
+
+            if self.backjumping:
+
+                nogood = self.violated_nogood(slot, word)
+
+                if nogood is not None:
+
+                    if stats is not None:
+
+                        stats.reject(slot)
+
+                    conflicts.update(index for index, _ in nogood if index != slot.index)
+                    continue
+
+            if stats is not None:
+
+                started = time.perf_counter()
+
+            # Used words and words that don't fit were removed ahead of time or rejected above
+            mark = crossword.place(slot.cells, word)
+            trail_mark = len(self.trail)
+
+            jump = None
+            consistent = self.assign(slot, word)
+
+            if stats is not None:
+
+                stats.place(slot, time.perf_counter() - started)
+
+            # Don't descend if propagation shows another slot can no longer be filled
+            if consistent:
+
+                child_conflicts = yield from self.search(crossword, slot_index+1)
+
+                # Leave the filled grid as it is, the search is over
+                if self.stopped:
+
+                    return None
+
+                if self.trace >= TRACE_EVENTS:
+
+                    print('=> Backtracking')
+
+                self.num_backtracks += 1
+
+                if self.backjumping:
+
+                    # This slot's word played no part in the failure below it
+                    if slot.index not in child_conflicts:
+
+                        jump = child_conflicts
+
+                    conflicts.update(child_conflicts - {slot.index})
+
+            elif self.backjumping:
+
+                if self.wiped_out is None:
+
+                    conflicts.update(set(self.assignment) - {slot.index})
+
+                else:
+
+                    conflicts.update(self.conflicts(self.wiped_out) - {slot.index})
+
+            if stats is not None:
+
+                started = time.perf_counter()
+
+            self.unassign(slot, trail_mark)
+            crossword.undo(mark)
+
+            if stats is not None:
+
+                stats.remove(slot, time.perf_counter() - started)
+
+            if jump is not None:
+
+                if self.trace >= TRACE_EVENTS:
+
+                    print('=> Backjumping')
+
+                self.num_backjumps += 1
+                self.frames.pop()
+
+                return jump
+
+        self.frames.pop()
+
+        if self.backjumping:
+
+            # Words handed off elsewhere weren't tried, or a solution was found below, so
+            # nothing can be concluded here
+            if frame[3]:
+
+                return set(self.assignment)
+
+            self.learn(conflicts)
+
+            return conflicts
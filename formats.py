@@ -0,0 +1,214 @@
+'''Loading crossword grids from plain text, Across Lite (.puz) and ipuz files.'''
+
+import json
+import os
+
+# Where the Across Lite magic string sits, and where the grid starts relative to it
+PUZ_MAGIC = b'ACROSS&DOWN\x00'
+PUZ_MAGIC_OFFSET = 0x02
+PUZ_WIDTH_OFFSET = 0x2C
+PUZ_GRID_OFFSET = 0x34
+
+def convert_case(letter, case):
+
+    '''Converts a pre-filled letter to the case of the word list.
+
+    :param letter: The letter
+    :param case: 'lower', 'upper' or None to keep it as it is
+    :return: The converted letter
+    '''
+
+    if case == 'lower':
+
+        return letter.lower()
+
+    if case == 'upper':
+
+        return letter.upper()
+
+    return letter
+
+
+def parse_text(text, case=None):
+
+    '''Reads a grid written as text, one row per line.
+
+    '#' is a block, and '.', '_' and '*' are empty cells, so both plain grids and grids
+    with hand-placed start markers are read. Any letter is a pre-filled cell.
+
+    :param text: The grid
+    :param case: 'lower', 'upper' or None (see `convert_case()`)
+    :return: The crossword as a list of row strings, using '#' and '_'
+    :raises ValueError: If the rows have different lengths or a cell is not understood
+    '''
+
+    rows = []
+
+    for line in text.split():
+
+        row = []
+
+        for element in line:
+
+            if element in '._*':
+
+                row.append('_')
+
+            elif element == '#' or element.isascii() and element.isalpha():
+
+                row.append(convert_case(element, case))
+
+            else:
+
+                raise ValueError(f'Unknown cell {element!r} in row {len(rows)}')
+
+        rows.append(''.join(row))
+
+    if not rows or any(len(row) != len(rows[0]) for row in rows):
+
+        raise ValueError('A grid needs at least one row, and rows of the same length')
+
+    return rows
+
+
+def read_puz(data, case=None):
+
+    '''Reads the grid of an Across Lite puzzle.
+
+    The file holds the solution and then the player's grid, each one byte per cell, row by
+    row. The player's grid is the one read, with '.' for blocks, '-' for empty cells and
+    letters for the cells already filled in. Clues and extra sections are ignored.
+
+    :param data: The contents of the .puz file
+    :param case: 'lower', 'upper' or None (see `convert_case()`)
+    :return: The crossword as a list of row strings, using '#' and '_'
+    :raises ValueError: If the data is not an Across Lite puzzle
+    '''
+
+    # Some files have a few bytes in front, everything is relative to the magic string
+    base = data.find(PUZ_MAGIC) - PUZ_MAGIC_OFFSET
+
+    if base < 0:
+
+        raise ValueError('Not an Across Lite puzzle')
+
+    width = data[base + PUZ_WIDTH_OFFSET]
+    height = data[base + PUZ_WIDTH_OFFSET + 1]
+    start = base + PUZ_GRID_OFFSET + width * height
+    state = data[start:start + width * height].decode('latin-1')
+
+    if width == 0 or height == 0 or len(state) != width * height:
+
+        raise ValueError('The Across Lite puzzle is cut short')
+
+    cells = ''.join('#' if element == '.' else
+                    convert_case(element, case) if element.isascii() and element.isalpha()
+                    else '_' for element in state)
+
+    return [cells[i * width:(i + 1) * width] for i in range(height)]
+
+
+def read_ipuz(document, case=None):
+
+    '''Reads the grid of an ipuz crossword.
+
+    Each cell of `puzzle` is a clue number, the empty value, the block value, null for a
+    cell left out of the grid, or a dictionary with the number under 'cell'. Letters
+    given in the puzzle come from a dictionary's 'value', or from the `saved` grid of a
+    puzzle that has been partly filled in.
+
+    :param document: The decoded ipuz JSON
+    :param case: 'lower', 'upper' or None (see `convert_case()`)
+    :return: The crossword as a list of row strings, using '#' and '_'
+    :raises ValueError: If the document has no grid, or a grid or saved grid that isn't
+                        of the size it gives
+    '''
+
+    try:
+
+        width = document['dimensions']['width']
+        height = document['dimensions']['height']
+        puzzle = document['puzzle']
+
+    except (KeyError, TypeError):
+
+        raise ValueError('Not an ipuz crossword') from None
+
+    if not all(isinstance(size, int) and size > 0 for size in (width, height)):
+
+        raise ValueError('The ipuz dimensions must be positive whole numbers')
+
+    block = document.get('block', '#')
+    empty = document.get('empty', 0)
+
+    saved = document.get('saved') or [[None] * width for _ in range(height)]
+
+    for name, grid in (('puzzle', puzzle), ('saved', saved)):
+
+        if (not isinstance(grid, list) or len(grid) != height
+                or any(not isinstance(row, list) or len(row) != width for row in grid)):
+
+            raise ValueError(f'The ipuz {name} grid is not {width}x{height}')
+
+    def letter_of(cell):
+
+        value = cell.get('value') if isinstance(cell, dict) else cell
+
+        if isinstance(value, str) and value.isascii() and value.isalpha():
+
+            return convert_case(value, case)
+
+        return None
+
+    rows = []
+
+    for i, row in enumerate(puzzle):
+
+        cells = []
+
+        for j, cell in enumerate(row):
+
+            number = cell.get('cell', empty) if isinstance(cell, dict) else cell
+
+            if cell is None or number == block:
+
+                cells.append('#')
+                continue
+
+            letter = letter_of(cell) or letter_of(saved[i][j])
+            cells.append(letter or '_')
+
+        rows.append(''.join(cells))
+
+    return rows
+
+
+def load_grid(path, case=None):
+
+    '''Loads a crossword grid, telling the format by the file's extension.
+
+    '.puz' files are read by `read_puz()`, '.ipuz' files by `read_ipuz()` and anything
+    else as text by `parse_text()`.
+
+    :param path: The path of the grid
+    :param case: 'lower' or 'upper' to convert pre-filled letters to the case of the word
+                 list, or None to keep them as they are
+    :return: The crossword as a list of row strings, using '#' for blocks, '_' for empty
+             cells and letters for pre-filled ones
+    '''
+
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.puz':
+
+        with open(path, 'rb') as puzzle_file:
+
+            return read_puz(puzzle_file.read(), case)
+
+    with open(path, 'r', encoding='utf-8') as puzzle_file:
+
+        if extension == '.ipuz':
+
+            return read_ipuz(json.load(puzzle_file), case)
+
+        return parse_text(puzzle_file.read(), case)
@@ -0,0 +1,123 @@
+'''Mutable crossword grid with an undo trail.'''
+
+EMPTY = ord('_')
+BLOCK = ord('#')
+
+# The other ways an empty cell may be written
+MARKERS = str.maketrans('*.', '__')
+
+class Grid:
+
+    def __init__(self, crossword):
+
+        '''Class stores a crossword puzzle as one flat bytearray.
+
+        Cell `(row, col)` lives at index `row * width + col`. Placing a word writes only
+        the empty cells it covers and pushes their indexes onto `trail`; undoing pops
+        exactly those cells back to empty, so letters shared with crossing words are left
+        alone and backtracking costs O(word length) instead of a copy of the grid.
+
+        :param crossword: The crossword puzzle as a list of row strings
+        '''
+
+        self.width = len(crossword[0])
+        self.height = len(crossword)
+
+        # Start markers are only needed to find the word spaces, they are empty cells, as
+        # are the '.' cells of plain grids
+        self.cells = bytearray(''.join(crossword).translate(MARKERS), 'ascii')
+        self.remaining = self.cells.count(EMPTY)
+        self.trail = []
+
+
+    def __iter__(self):
+
+        '''Iterates over the rows of the grid as strings, so it can be printed.'''
+
+        for row in range(self.height):
+
+            start = row * self.width
+            yield self.cells[start:start + self.width].decode('ascii')
+
+
+    def word_cells(self, direction, row, col, word_length):
+
+        '''Returns the cell indexes covered by a word space.
+
+        :param direction: Whether the word space is 'ACROSS' or 'DOWN'
+        :param row: The row the word space starts on
+        :param col: The column the word space starts on
+        :param word_length: The length of the word space
+        :return: A range over the flat indexes of the word space's cells
+        '''
+
+        step = 1 if direction == 'ACROSS' else self.width
+        start = row * self.width + col
+
+        return range(start, start + word_length * step, step)
+
+
+    def pattern(self, cells):
+
+        '''Returns the letters currently in a word space.
+
+        :param cells: The cell indexes of the word space
+        :return: The letters as bytes, with '_' for each empty cell
+        '''
+
+        return bytes(self.cells[cell] for cell in cells)
+
+
+    def fits(self, cells, word):
+
+        '''Determines whether a word agrees with the letters already in its cells.
+
+        :param cells: The cell indexes of the word space
+        :param word: The word to be tested
+        :return: True/False, whether every filled cell matches the word
+        '''
+
+        for cell, letter in zip(cells, word.encode('ascii')):
+
+            if self.cells[cell] != EMPTY and self.cells[cell] != letter:
+
+                return False
+
+        return True
+
+
+    def place(self, cells, word):
+
+        '''Writes a word into the empty cells of a word space.
+
+        :param cells: The cell indexes of the word space
+        :param word: The word to be placed
+        :return: The trail mark to pass to `undo()` to remove the word again
+        '''
+
+        mark = len(self.trail)
+
+        for cell, letter in zip(cells, word.encode('ascii')):
+
+            if self.cells[cell] == EMPTY:
+
+                self.cells[cell] = letter
+                self.trail.append(cell)
+
+        self.remaining -= len(self.trail) - mark
+
+        return mark
+
+
+    def undo(self, mark):
+
+        '''Empties every cell written since a trail mark was taken.
+
+        :param mark: The trail mark returned by `place()`
+        '''
+
+        self.remaining += len(self.trail) - mark
+
+        while len(self.trail) > mark:
+
+            self.cells[self.trail.pop()] = EMPTY
@@ -0,0 +1,211 @@
+'''Per-slot counters and profiling hooks for the search.'''
+
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import time
+
+class Instrumentation:
+
+    def __init__(self, interval=None, on_snapshot=None):
+
+        '''Class counts what the search does in each slot.
+
+        An `Engine` given an instrumentation calls it at every node; one without does a
+        single `is None` check instead, so leaving it off costs close to nothing. Per slot,
+        by `slot.index`, it counts:
+
+        1. `nodes`, the number of times the slot was chosen to be filled.
+
+        2. `tried`, the number of words placed in it.
+
+        3. `rejected`, the number of words skipped when they came up, for clashing with a
+        letter on the board, being used already or completing a nogood.
+
+        4. `pruned`, the number of words removed from its domain by propagation.
+
+        5. `filter_time` and `place_time`, the seconds spent working out which words to try
+        and placing, propagating and removing them.
+
+        :param interval: Take a snapshot every `interval` nodes, or None for no snapshots
+        :param on_snapshot: The function each snapshot is passed to, e.g. `print`
+        '''
+
+        self.interval = interval
+        self.on_snapshot = on_snapshot
+        self.start_time = time.perf_counter()
+        self.total_nodes = 0
+
+        self.labels = []
+        self.nodes = []
+        self.tried = []
+        self.rejected = []
+        self.pruned = []
+        self.filter_time = []
+        self.place_time = []
+
+
+    def attach(self, slots):
+
+        '''Resets the counters for the slots of a newly compiled puzzle.
+
+        :param slots: The compiled slots
+        '''
+
+        self.labels = [None] * len(slots)
+
+        for slot in slots:
+
+            self.labels[slot.index] = f'{slot.direction} {slot.start} length {slot.length}'
+
+        self.nodes = [0] * len(slots)
+        self.tried = [0] * len(slots)
+        self.rejected = [0] * len(slots)
+        self.pruned = [0] * len(slots)
+        self.filter_time = [0.0] * len(slots)
+        self.place_time = [0.0] * len(slots)
+
+
+    def node(self, slot, elapsed):
+
+        '''Records a visit to a slot and the time spent filtering its words.
+
+        :param slot: The slot chosen to be filled
+        :param elapsed: The seconds `Engine.forward_check()` took
+        '''
+
+        self.nodes[slot.index] += 1
+        self.filter_time[slot.index] += elapsed
+        self.total_nodes += 1
+
+        if self.interval and self.total_nodes % self.interval == 0:
+
+            self.on_snapshot(self.snapshot())
+
+
+    def place(self, slot, elapsed):
+
+        '''Records a word placed in a slot and the time spent placing it.
+
+        :param slot: The slot the word was placed in
+        :param elapsed: The seconds placing the word and propagating it took
+        '''
+
+        self.tried[slot.index] += 1
+        self.place_time[slot.index] += elapsed
+
+
+    def remove(self, slot, elapsed):
+
+        '''Records the time spent removing a word from a slot.
+
+        :param slot: The slot the word was removed from
+        :param elapsed: The seconds undoing the word and its propagation took
+        '''
+
+        self.place_time[slot.index] += elapsed
+
+
+    def reject(self, slot):
+
+        '''Records a word skipped when it came up for a slot.
+
+        :param slot: The slot the word was skipped for
+        '''
+
+        self.rejected[slot.index] += 1
+
+
+    def prune(self, slot, count):
+
+        '''Records words removed from a slot's domain by propagation.
+
+        :param slot: The slot whose domain shrank
+        :param count: The number of words removed
+        '''
+
+        self.pruned[slot.index] += count
+
+
+    def snapshot(self):
+
+        '''Returns the counters so far.
+
+        :return: A dictionary of the totals and a list with the counters of each slot,
+                 ready to be written as JSON
+        '''
+
+        slots = [{'slot': label, 'nodes': nodes, 'tried': tried, 'rejected': rejected,
+                  'pruned': pruned, 'filter_time': filter_time, 'place_time': place_time}
+                 for label, nodes, tried, rejected, pruned, filter_time, place_time
+                 in zip(self.labels, self.nodes, self.tried, self.rejected, self.pruned,
+                        self.filter_time, self.place_time)]
+
+        return {'elapsed': time.perf_counter() - self.start_time,
+                'nodes': self.total_nodes,
+                'tried': sum(self.tried),
+                'rejected': sum(self.rejected),
+                'pruned': sum(self.pruned),
+                'filter_time': sum(self.filter_time),
+                'place_time': sum(self.place_time),
+                'slots': slots}
+
+
+    def dump(self, path):
+
+        '''Writes the final counters as JSON.
+
+        :param path: The path of the file to be written
+        '''
+
+        with open(path, 'w') as stats_file:
+
+            json.dump(self.snapshot(), stats_file, indent=2)
+
+
+def summary(snapshot):
+
+    '''Formats a snapshot as one line, e.g. for periodic progress output.
+
+    :param snapshot: A snapshot returned by `Instrumentation.snapshot()`
+    :return: The line
+    '''
+
+    return (f"[{snapshot['elapsed']:.3f}s] {snapshot['nodes']} nodes, "
+            f"{snapshot['tried']} words tried, {snapshot['rejected']} rejected, "
+            f"{snapshot['pruned']} pruned, {snapshot['filter_time']:.3f}s filtering, "
+            f"{snapshot['place_time']:.3f}s placing")
+
+
+@contextlib.contextmanager
+def profiled(path=None, limit=20):
+
+    '''Runs the enclosed code under cProfile.
+
+    :param path: The file the raw profile is saved to, for e.g. `snakeviz`, or None to
+                 print the functions with the most cumulative time instead
+    :param limit: The number of functions printed
+    '''
+
+    profile = cProfile.Profile()
+    profile.enable()
+
+    try:
+
+        yield profile
+
+    finally:
+
+        profile.disable()
+
+        if path is not None:
+
+            profile.dump_stats(path)
+
+        else:
+
+            output = io.StringIO()
+            pstats.Stats(profile, stream=output).sort_stats('cumulative').print_stats(limit)
+            print(output.getvalue())
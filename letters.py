@@ -0,0 +1,301 @@
+'''Backtracking search over the cells of a crossword puzzle, one letter at a time.'''
+
+import random
+import time
+
+import utility
+
+from dawg import graph_for
+from engine import TRACE_EVENTS, TRACE_GRIDS, TRACE_OFF
+from grid import EMPTY, Grid
+from puzzle import compile_slots
+
+class LetterEngine:
+
+    def __init__(self, trace=TRACE_OFF, seed=None):
+
+        '''Class fills a crossword puzzle cell by cell instead of word by word.
+
+        The cells are filled row by row, left to right, so when a cell comes up the cells
+        before it in its across and down word spaces are already filled. Each word space
+        keeps the node of the word graph (see `dawg.Dawg`) its letters so far lead to, and
+        the letters allowed in a cell are those leaving both nodes: one bitwise AND of their
+        masks. A crossing that no word can complete is found as soon as the letter that
+        ruins it is placed, rather than after whole words are placed on both sides.
+
+        Filling in grid order means a dead end often shows up far from the cell that caused
+        it, so failures always jump straight back to the most recent cell that could have
+        made a difference (see `search()`).
+
+        It offers the same interface as `Engine`, so it can be used wherever one is, but
+        has no strategies to choose: cells are always filled in grid order and letters in
+        alphabetical order.
+
+        :param trace: How much of the search is printed, `TRACE_OFF`, `TRACE_EVENTS` or
+                      `TRACE_GRIDS`
+        :param seed: If given, the letters of each cell are tried in a random order, so that
+                     restarts explore a different part of the tree each time
+        '''
+
+        self.trace = trace
+        self.random = random.Random(seed) if seed is not None else None
+        self.num_nodes = 0
+        self.num_backtracks = 0
+        self.num_backjumps = 0
+        self.num_pruned = 0
+        self.start_time = time.time()
+
+        self.slots = []
+        self.solution = None
+        self.stopped = False
+        self.on_node = None
+
+        # The cells to be filled in order, as `(cell, across slot, down slot)` with None for
+        # a missing direction, the slots whose last cell each one is, the positions in the
+        # order of the cells before it in its slots, and the positions of each slot's cells
+        self.order = []
+        self.endings = []
+        self.prefixes = []
+        self.positions = []
+
+        # The word graph node each slot's prefix has reached, the words placed so far, and
+        # the slot each used word is in (None for words used before the search)
+        self.graph = None
+        self.states = []
+        self.assignment = {}
+        self.used = {}
+
+
+    def setup(self, crossword, lexicon, used_words=()):
+
+        '''Compiles a crossword puzzle and works out the order its cells are filled in.
+
+        :param crossword: The unfilled crossword puzzle as a list of row strings
+        :param lexicon: The `Lexicon` to fill it from
+        :param used_words: Words that may not be placed
+        :return: The `Grid` to be passed to `solve()`, or None if some word space has no
+                 words of its length
+        '''
+
+        grid = Grid(crossword)
+        self.slots = compile_slots(crossword, grid, None)
+        self.graph = graph_for(lexicon)
+        self.used = {word: None for word in used_words}
+
+        if any(slot.length not in self.graph.roots for slot in self.slots):
+
+            return None
+
+        self.states = [self.graph.roots[slot.length] for slot in self.slots]
+
+        covering = {}
+
+        for slot in self.slots:
+
+            for cell in slot.cells:
+
+                covering.setdefault(cell, [None, None])[slot.direction == 'DOWN'] = slot
+
+        for cell in sorted(covering):
+
+            across, down = covering[cell]
+            self.order.append((cell, across, down))
+            self.endings.append([slot for slot in (across, down)
+                                 if slot is not None and slot.cells[-1] == cell])
+
+        position = {cell: i for i, (cell, _, _) in enumerate(self.order)}
+        self.positions = [{position[cell] for cell in slot.cells} for slot in self.slots]
+
+        for i, (cell, across, down) in enumerate(self.order):
+
+            self.prefixes.append({other for slot in (across, down) if slot is not None
+                                  for other in self.positions[slot.index] if other < i})
+
+        return grid
+
+
+    def completion_check(self, crossword):
+
+        '''Checks whether every slot has a word. If so, the solution is recorded.
+
+        :param crossword: The crossword state to be checked for completion
+        :return: True/False, whether the crossword is complete
+        '''
+
+        if len(self.assignment) == len(self.slots):
+
+            self.solution = list(crossword)
+            self.stopped = True
+            return True
+
+        return False
+
+
+    def allowed(self, crossword, position):
+
+        '''Works out the letters a cell can take.
+
+        :param crossword: The grid being filled
+        :param position: The position of the cell in `order`
+        :return: The list of letter bits, in the order they are to be tried
+        '''
+
+        cell, across, down = self.order[position]
+        masks = self.graph.masks
+        mask = (1 << len(self.graph.alphabet)) - 1
+
+        if across is not None:
+
+            mask &= masks[self.states[across.index]]
+
+        if down is not None:
+
+            mask &= masks[self.states[down.index]]
+
+        # A letter given in the puzzle is the only one allowed
+        if crossword.cells[cell] != EMPTY:
+
+            bit = self.graph.bits.get(chr(crossword.cells[cell]))
+            mask = mask & (1 << bit) if bit is not None else 0
+
+        bits = [bit for bit in range(mask.bit_length()) if mask >> bit & 1]
+
+        if self.random is not None:
+
+            self.random.shuffle(bits)
+
+        return bits
+
+
+    def solve(self, crossword, slot_index):
+
+        '''Solves the crossword puzzle, stopping at the first solution.
+
+        :param crossword: The grid being filled in place
+        :param slot_index: The number of cells filled so far
+        '''
+
+        for _ in self.search(crossword, slot_index):
+
+            self.completion_check(crossword)
+            return
+
+
+    def search(self, crossword, slot_index):
+
+        '''Searches for every solution of the crossword puzzle.
+
+        Like `Engine.search()`, this is a generator yielding the grid itself each time
+        every slot has a word, and it unwinds without undoing anything once `stopped` is
+        set.
+
+        Every failure returns its conflict set, the positions of the filled cells that
+        caused it. The letters a cell can't take were ruled out by the cells before it in
+        its slots, and a word can't be completed twice because of the cells of both copies.
+        A cell that is not in the conflict set of the letter it just tried could not have
+        changed the outcome, so it returns straight away.
+
+        :param crossword: The grid being filled in place
+        :param slot_index: The number of cells filled so far
+        :return: A generator of the filled grid, whose return value is the conflict set of
+                 the failure
+        '''
+
+        if self.trace >= TRACE_GRIDS:
+
+            utility.print_puzzle(crossword)
+
+        self.num_nodes += 1
+
+        if slot_index == len(self.order):
+
+            yield crossword
+
+            # Nothing above a solution failed
+            return set(range(slot_index))
+
+        if self.on_node is not None:
+
+            self.on_node(self)
+
+            if self.stopped:
+
+                return None
+
+        cell, across, down = self.order[slot_index]
+        alphabet = self.graph.alphabet
+        conflicts = set(self.prefixes[slot_index])
+
+        for bit in self.allowed(crossword, slot_index):
+
+            mark = crossword.place((cell,), alphabet[bit])
+            saved = [(slot, self.states[slot.index]) for slot in (across, down)
+                     if slot is not None]
+
+            for slot, node in saved:
+
+                self.states[slot.index] = self.graph.child(node, bit)
+
+            # A completed word may not be used twice
+            completed = []
+            jump = None
+
+            for slot in self.endings[slot_index]:
+
+                word = crossword.pattern(slot.cells).decode('ascii')
+
+                if word in self.used:
+
+                    owner = self.used[word]
+                    conflicts.update(self.positions[slot.index])
+
+                    if owner is not None:
+
+                        conflicts.update(self.positions[owner.index])
+
+                    break
+
+                self.used[word] = slot
+                self.assignment[slot.index] = word
+                completed.append(slot)
+
+            else:
+
+                child_conflicts = yield from self.search(crossword, slot_index + 1)
+
+                if self.stopped:
+
+                    return None
+
+                if self.trace >= TRACE_EVENTS:
+
+                    print('=> Backtracking')
+
+                self.num_backtracks += 1
+
+                # This cell's letter played no part in the failure below it
+                if slot_index not in child_conflicts:
+
+                    jump = child_conflicts
+
+                conflicts.update(child_conflicts)
+
+            for slot in completed:
+
+                del self.used[self.assignment.pop(slot.index)]
+
+            for slot, node in saved:
+
+                self.states[slot.index] = node
+
+            crossword.undo(mark)
+
+            if jump is not None:
+
+                self.num_backjumps += 1
+
+                return jump
+
+        conflicts.discard(slot_index)
+
+        return conflicts
@@ -0,0 +1,727 @@
+'''Word list storage as NumPy letter matrices, with an on-disk memory-mapped cache.'''
+
+import gzip
+import hashlib
+import json
+import lzma
+import mmap
+import os
+
+import numpy as np
+
+from grid import EMPTY
+
+MAGIC = b'XWLEX\x00\x01\x00'
+
+# The first bytes of compressed word lists, and how to open each kind as text
+COMPRESSIONS = ((b'\x1f\x8b', gzip.open), (b'\xfd7zXZ\x00', lzma.open))
+
+# The case words are converted to unless another is asked for, so 'Paris' and 'paris'
+# are one word
+DEFAULT_CASE = 'lower'
+
+class Lexicon:
+
+    def __init__(self, matrices, sorters, indexes, offsets, buffer=None):
+
+        '''Class stores a word list as one letter matrix per word length.
+
+        Each word is given an ID within its length bucket (its row in the matrix), and row
+        `n` of `matrices[length]` holds the ASCII codes of word `n`. A domain is a sorted
+        NumPy array of word IDs, so filtering it against the letters already on the board
+        is a single vectorized comparison over the matrix columns. Ex:
+
+                'ab_l_' -> matrix[domain][:, [0, 1, 3]] == [ord('a'), ord('b'), ord('l')]
+
+        The remaining tables are derived from the matrices by `from_words()`, or read
+        straight out of a cache file by `read_cache()`:
+
+        1. `sorters[length]`, the word IDs in sorted word order, to look words up.
+
+        2. `indexes[length][position]`, the word IDs grouped by their letter at the position
+        (ascending within each group), and `offsets[length][position][letter]`, where each
+        group starts. Ex:
+
+                IDs with 'l' at 3 -> indexes[5][3][offsets[5][3][108]:offsets[5][3][109]]
+
+        :param matrices: The uint8 letter matrix of each word length
+        :param sorters: The word IDs of each length in sorted word order
+        :param indexes: The positional letter index of each length
+        :param offsets: The start of each letter's group in the index, per length
+        :param buffer: The memory map the arrays live in, kept open while they are used
+        '''
+
+        self.matrices = matrices
+        self.sorters = sorters
+        self.indexes = indexes
+        self.offsets = offsets
+        self.buffer = buffer
+
+        # How often each letter is at each position, the words as strings and the digest
+        # of the contents once needed
+        self.frequencies = {length: np.diff(offsets[length], axis=1) for length in offsets}
+        self.buckets = {}
+        self.fingerprint = None
+
+
+    def words_of_length(self, length):
+
+        '''Returns every word of a given length, in word list order.
+
+        :param length: The length of the word space
+        :return: The list of words with that length
+        '''
+
+        if length not in self.buckets:
+
+            keys = self.matrix(length).view(f'S{length}').ravel()
+            self.buckets[length] = [key.decode('ascii') for key in keys.tolist()]
+
+        return self.buckets[length]
+
+
+    def matrix(self, length):
+
+        '''Returns the letter matrix of the words of a given length.
+
+        :param length: The length of the word space
+        :return: A uint8 array with one row per word and one column per letter position
+        '''
+
+        if length not in self.matrices:
+
+            return np.zeros((0, length), dtype=np.uint8)
+
+        return self.matrices[length]
+
+
+    def frequency(self, length):
+
+        '''Returns how often each letter appears at each position of words of a length.
+
+        :param length: The length of the word space
+        :return: An array with one row per position and one count per letter code
+        '''
+
+        if length not in self.frequencies:
+
+            return np.zeros((length, 256), dtype=np.int32)
+
+        return self.frequencies[length]
+
+
+    def word_id(self, word):
+
+        '''Looks up the ID of a word by binary search over the sorted word order.
+
+        :param word: The word to be looked up
+        :return: The word's ID within its length bucket, or None if it is not in the lexicon
+        '''
+
+        length = len(word)
+
+        if length not in self.matrices:
+
+            return None
+
+        keys = self.matrices[length].view(f'S{length}').ravel()
+        key = word.encode('ascii')
+        i = np.searchsorted(keys, key, sorter=self.sorters[length])
+
+        if i < len(keys) and keys[self.sorters[length][i]] == key:
+
+            return int(self.sorters[length][i])
+
+        return None
+
+
+    def digest(self):
+
+        '''Returns a hash of the words in the lexicon, in word list order.
+
+        Two lexicons holding the same words in the same order have the same digest, however
+        they were built or loaded.
+
+        :return: The hex digest
+        '''
+
+        if self.fingerprint is None:
+
+            digest = hashlib.sha256()
+
+            for length in sorted(self.matrices):
+
+                digest.update(f'{length}:{len(self.matrices[length])};'.encode('ascii'))
+                digest.update(np.ascontiguousarray(self.matrices[length]).tobytes())
+
+            self.fingerprint = digest.hexdigest()
+
+        return self.fingerprint
+
+
+    def letter_case(self):
+
+        '''Works out the case the words are written in, so grids can be loaded to match.
+
+        :return: 'lower' or 'upper' if every letter is in that case, otherwise None
+        '''
+
+        lower = any((matrix >= ord('a')).any() for matrix in self.matrices.values())
+        upper = any((matrix < ord('a')).any() for matrix in self.matrices.values())
+
+        if lower != upper:
+
+            return 'lower' if lower else 'upper'
+
+        return None
+
+
+    def full_domain(self, length):
+
+        '''Returns the domain holding every word of a given length.
+
+        :param length: The length of the word space
+        :return: An array of every word ID of that length
+        '''
+
+        return np.arange(len(self.matrix(length)), dtype=np.int32)
+
+
+    def candidates(self, length, pattern):
+
+        '''Finds every word agreeing with a partially filled pattern.
+
+        The positional index gives the words with each filled letter directly, so only
+        the shortest of those groups is filtered against the rest of the pattern.
+
+        :param length: The length of the word space
+        :param pattern: The pattern as bytes, with '_' for each unknown letter
+        :return: The array of matching word IDs
+        '''
+
+        codes = np.frombuffer(pattern, dtype=np.uint8)
+        positions = np.flatnonzero(codes != EMPTY)
+
+        if len(positions) == 0 or length not in self.matrices:
+
+            return self.full_domain(length)
+
+        starts = self.offsets[length][positions, codes[positions]]
+        ends = self.offsets[length][positions, codes[positions].astype(np.int32) + 1]
+        best = np.argmin(ends - starts)
+
+        group = self.indexes[length][positions[best], starts[best]:ends[best]]
+
+        return self.match(group, length, pattern)
+
+
+    def restrict(self, domain, length, position, letter):
+
+        '''Keeps only the words in a domain that have a letter at a position.
+
+        :param domain: The array of word IDs to be filtered
+        :param length: The length of the words in the domain
+        :param position: The index of the letter within the word
+        :param letter: The letter required at that position
+        :return: The filtered array
+        '''
+
+        return domain[self.matrix(length)[domain, position] == ord(letter)]
+
+
+    def match(self, domain, length, pattern):
+
+        '''Keeps only the words in a domain that agree with a partially filled pattern.
+
+        :param domain: The array of word IDs to be filtered
+        :param length: The length of the words in the domain
+        :param pattern: The pattern as bytes, with '_' for each unknown letter
+        :return: The filtered array
+        '''
+
+        codes = np.frombuffer(pattern, dtype=np.uint8)
+        positions = np.flatnonzero(codes != EMPTY)
+
+        if len(positions) == 0:
+
+            return domain
+
+        letters = self.matrix(length)[np.ix_(domain, positions)]
+
+        return domain[(letters == codes[positions]).all(axis=1)]
+
+
+    def revise(self, domain, length, position, other_domain, other_length, other_position):
+
+        '''Keeps only the words in a domain compatible with another domain at a crossing.
+
+        The letters appearing at `other_position` in the other domain are marked in a
+        256-entry table, and the words of the domain are kept if their letter at `position`
+        is marked.
+
+        :param domain: The array of word IDs to be filtered
+        :param length: The length of the words in the domain
+        :param position: The index of the crossing cell within those words
+        :param other_domain: The array of word IDs on the other side of the crossing
+        :param other_length: The length of the words in the other domain
+        :param other_position: The index of the crossing cell within those words
+        :return: The filtered array
+        '''
+
+        present = np.zeros(256, dtype=bool)
+        present[self.matrix(other_length)[other_domain, other_position]] = True
+
+        return domain[present[self.matrix(length)[domain, position]]]
+
+
+    def singleton(self, word):
+
+        '''Returns the domain holding just one word.
+
+        :param word: The word in the domain
+        :return: An array with only the word's ID
+        '''
+
+        return np.array([self.word_id(word)], dtype=np.int32)
+
+
+    def discard(self, domain, word):
+
+        '''Removes a single word from a domain.
+
+        Domains are kept in ascending ID order, so the word is found by binary search.
+
+        :param domain: The array of word IDs the word should be removed from
+        :param word: The word to be removed
+        :return: The array without the word, or `domain` itself if the word isn't in it
+        '''
+
+        return self.discard_id(domain, self.word_id(word))
+
+
+    def discard_id(self, domain, word_id):
+
+        '''Removes a single word ID from a domain, e.g. from several domains in turn.
+
+        :param domain: The array of word IDs the ID should be removed from
+        :param word_id: The ID to be removed, or None for a word not in the lexicon
+        :return: The array without the ID, or `domain` itself if the ID isn't in it
+        '''
+
+        if word_id is None:
+
+            return domain
+
+        position = np.searchsorted(domain, word_id)
+
+        if position == len(domain) or domain[position] != word_id:
+
+            return domain
+
+        return np.delete(domain, position)
+
+
+    def size(self, domain):
+
+        '''Returns the number of words in a domain.
+
+        :param domain: The array of word IDs to be counted
+        :return: The number of IDs
+        '''
+
+        return len(domain)
+
+
+    def words(self, length, domain):
+
+        '''Converts a domain back into its words, in the order of the IDs.
+
+        :param length: The length of the words in the domain
+        :param domain: The array of word IDs to be converted
+        :return: The list of words
+        '''
+
+        bucket = self.words_of_length(length)
+
+        return [bucket[i] for i in domain.tolist()]
+
+
+def from_words(words):
+
+    '''Builds a lexicon in memory from a list of words.
+
+    The words are packed into one byte buffer per length as they come, so an iterator such
+    as `read_words()` is consumed without the strings being kept alive. Repeated words are
+    dropped as they come too, so the memory used grows with the words kept, not with the
+    entries read.
+
+    :param words: The words making up the lexicon, duplicates are ignored
+    :return: The `Lexicon`
+    '''
+
+    buckets = {}
+
+    # Duplicate entries would only be tried twice, so all but the first are dropped
+    seen = set()
+
+    for word in words:
+
+        key = word.encode('ascii')
+
+        if key in seen:
+
+            continue
+
+        seen.add(key)
+        buckets.setdefault(len(word), bytearray()).extend(key)
+
+    del seen
+
+    matrices, sorters, indexes, offsets = {}, {}, {}, {}
+
+    for length, bucket in sorted(buckets.items()):
+
+        matrices[length] = np.frombuffer(bucket, dtype=np.uint8).reshape(-1, length)
+
+        sorters[length] = np.argsort(matrices[length].view(f'S{length}').ravel(),
+                                     kind='stable').astype(np.int32)
+
+        # A stable sort by letter keeps the IDs ascending within each letter's group
+        indexes[length] = np.array([np.argsort(matrices[length][:, position], kind='stable')
+                                    for position in range(length)], dtype=np.int32)
+
+        counts = np.array([np.bincount(matrices[length][:, position], minlength=256)
+                           for position in range(length)])
+        offsets[length] = np.zeros((length, 257), dtype=np.int32)
+        offsets[length][:, 1:] = np.cumsum(counts, axis=1)
+
+    return Lexicon(matrices, sorters, indexes, offsets)
+
+
+def open_word_list(source):
+
+    '''Opens a word list as text, decompressing it on the fly if it is gzip or xz.
+
+    The kind of file is told by its first bytes, not its name.
+
+    :param source: The path of the word list
+    :return: The open text file
+    '''
+
+    with open(source, 'rb') as word_file:
+
+        head = word_file.read(8)
+
+    for magic, opener in COMPRESSIONS:
+
+        if head.startswith(magic):
+
+            return opener(source, 'rt', encoding='utf-8', errors='replace')
+
+    return open(source, 'r', encoding='utf-8', errors='replace')
+
+
+def read_words(source, lengths=None, min_score=None, case=DEFAULT_CASE):
+
+    '''Streams the words of a word list, one line at a time.
+
+    Each line holds a word, optionally followed by a score, separated by whitespace or
+    a ';' as in 'aardvark;50'. Blank lines and entries that aren't plain ASCII letters are
+    skipped, so nothing is kept but the words yielded. Duplicates are yielded as they
+    come (see `from_words()`).
+
+    :param source: The path of the word list, plain or compressed (see `open_word_list()`)
+    :param lengths: If given, only words of these lengths are kept, e.g. the word space
+                    lengths of the puzzles to be filled (see `utility.slot_lengths()`)
+    :param min_score: If given, only words scored at least this are kept. Entries without
+                      a score are dropped
+    :param case: 'lower' or 'upper' to convert every word to that case, or None to keep
+                 the words as they are. Words are lower-cased by default
+    :return: A generator of the words
+    '''
+
+    with open_word_list(source) as word_file:
+
+        for line in word_file:
+
+            fields = line.replace(';', ' ').split()
+
+            if not fields:
+
+                continue
+
+            word = fields[0]
+
+            if lengths is not None and len(word) not in lengths:
+
+                continue
+
+            if not (word.isascii() and word.isalpha()):
+
+                continue
+
+            if min_score is not None:
+
+                try:
+
+                    if len(fields) < 2 or float(fields[1]) < min_score:
+
+                        continue
+
+                except ValueError:
+
+                    continue
+
+            if case == 'lower':
+
+                word = word.lower()
+
+            elif case == 'upper':
+
+                word = word.upper()
+
+            yield word
+
+
+def stream_lexicon(source, lengths=None, min_score=None, case=DEFAULT_CASE):
+
+    '''Builds a lexicon in memory from a word list too large to be read in one go.
+
+    Peak memory is bounded by the words kept rather than the size of the word list.
+
+    :param source: The path of the word list, plain or compressed
+    :param lengths: If given, only words of these lengths are kept
+    :param min_score: If given, only words scored at least this are kept
+    :param case: 'lower', 'upper' or None (see `read_words()`)
+    :return: The `Lexicon`
+    '''
+
+    return from_words(read_words(source, lengths, min_score, case))
+
+
+def file_digest(path):
+
+    '''Returns the SHA-256 hash of a file's contents.
+
+    :param path: The file to be hashed
+    :return: The hex digest
+    '''
+
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as source:
+
+        for chunk in iter(lambda: source.read(1 << 20), b''):
+
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def describe_filters(lengths=None, min_score=None, case=DEFAULT_CASE):
+
+    '''Puts the filters a lexicon is read with in the one form they are recorded in.
+
+    :param lengths: The word lengths kept, or None for every length
+    :param min_score: The lowest score kept, or None to keep unscored words
+    :param case: 'lower', 'upper' or None (see `read_words()`)
+    :return: A dictionary of the filters, as stored in the header of a cache file
+    '''
+
+    return {'lengths': sorted(int(length) for length in lengths)
+                       if lengths is not None else None,
+            'min_score': float(min_score) if min_score is not None else None,
+            'case': case}
+
+
+def cache_path(source, filters=None):
+
+    '''Returns where the compiled form of a word list is kept.
+
+    :param source: The path of the word list
+    :param filters: The filters returned by `describe_filters()`, by default none but the
+                    default case
+    :return: The path of its cache file, next to it with a '.lex' extension. A word list
+             read with other filters is cached under a name tagged with a hash of them, so
+             it never takes the place of the whole word list
+    '''
+
+    filters = filters or describe_filters()
+    base = os.path.splitext(source)[0]
+
+    if filters == describe_filters():
+
+        return base + '.lex'
+
+    tag = hashlib.sha256(json.dumps(filters, sort_keys=True).encode()).hexdigest()[:12]
+
+    return f'{base}.{tag}.lex'
+
+
+def write_cache(lexicon, path, source, filters=None):
+
+    '''Writes a lexicon to a binary cache file.
+
+    The file starts with `MAGIC`, the length of a JSON header and the header itself,
+    which holds the source's hash, size and modification time, the filters the words were
+    read with and the byte offset of every array. The arrays follow as raw, 8-byte aligned data so they can be mapped
+    straight into memory. The file is written under a temporary name and moved into
+    place, so readers never see a partial file.
+
+    :param lexicon: The `Lexicon` to be written
+    :param path: The path of the cache file
+    :param source: The path of the word list the lexicon was built from
+    :param filters: The filters returned by `describe_filters()`, by default none but the
+                    default case
+    '''
+
+    sections = []
+    lengths = {}
+    position = 0
+
+    for length in lexicon.matrices:
+
+        lengths[length] = {'count': len(lexicon.matrices[length])}
+
+        for name, table in (('matrix', lexicon.matrices), ('sorter', lexicon.sorters),
+                            ('index', lexicon.indexes), ('offsets', lexicon.offsets)):
+
+            data = np.ascontiguousarray(table[length]).tobytes()
+            lengths[length][name] = position
+
+            sections.append(data + b'\x00' * (-len(data) % 8))
+            position += len(sections[-1])
+
+    status = os.stat(source)
+    header = json.dumps({'digest': file_digest(source),
+                         'size': status.st_size,
+                         'mtime': status.st_mtime_ns,
+                         'filters': filters or describe_filters(),
+                         'lengths': lengths}).encode('ascii')
+    header += b' ' * (-(len(MAGIC) + 8 + len(header)) % 8)
+
+    temporary = f'{path}.{os.getpid()}.tmp'
+
+    with open(temporary, 'wb') as cache:
+
+        cache.write(MAGIC)
+        cache.write(len(header).to_bytes(8, 'little'))
+        cache.write(header)
+
+        for section in sections:
+
+            cache.write(section)
+
+    os.replace(temporary, path)
+
+
+def read_cache(path):
+
+    '''Memory-maps a cache file written by `write_cache()`.
+
+    The arrays are views into the mapped file, so nothing is copied and processes
+    reading the same file share its pages.
+
+    :param path: The path of the cache file
+    :return: The header dictionary and the `Lexicon`
+    '''
+
+    with open(path, 'rb') as cache:
+
+        buffer = mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if buffer[:len(MAGIC)] != MAGIC:
+
+        raise ValueError(f'{path} is not a lexicon cache file')
+
+    header_length = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], 'little')
+    start = len(MAGIC) + 8
+    header = json.loads(buffer[start:start + header_length])
+    start += header_length
+
+    matrices, sorters, indexes, offsets = {}, {}, {}, {}
+
+    for length, sections in header['lengths'].items():
+
+        length, count = int(length), sections['count']
+
+        matrices[length] = np.frombuffer(buffer, np.uint8, count * length,
+                                         start + sections['matrix']).reshape(count, length)
+        sorters[length] = np.frombuffer(buffer, np.int32, count, start + sections['sorter'])
+        indexes[length] = np.frombuffer(buffer, np.int32, length * count,
+                                        start + sections['index']).reshape(length, count)
+        offsets[length] = np.frombuffer(buffer, np.int32, length * 257,
+                                        start + sections['offsets']).reshape(length, 257)
+
+    return header, Lexicon(matrices, sorters, indexes, offsets, buffer)
+
+
+def build_lexicon(source, path=None, lengths=None, min_score=None, case=DEFAULT_CASE):
+
+    '''Compiles a word list into its cache file.
+
+    :param source: The path of the word list, one word per line, plain or compressed
+    :param path: The path of the cache file, by default next to the word list (see
+                 `cache_path()`)
+    :param lengths: If given, only words of these lengths are kept
+    :param min_score: If given, only words scored at least this are kept
+    :param case: 'lower', 'upper' or None (see `read_words()`)
+    :return: The `Lexicon` read back from the cache file
+    '''
+
+    filters = describe_filters(lengths, min_score, case)
+    path = path or cache_path(source, filters)
+    write_cache(stream_lexicon(source, lengths, min_score, case), path, source, filters)
+
+    return read_cache(path)[1]
+
+
+def load_lexicon(source, path=None, lengths=None, min_score=None, case=DEFAULT_CASE):
+
+    '''Loads a word list through its cache file, rebuilding the cache if it is stale.
+
+    The cache is trusted if it was built with the same filters, and the word list's size
+    and modification time are the ones it was built from. Otherwise the word list is
+    hashed, and the cache is only rebuilt if the contents actually changed. If the cache
+    can't be written, the lexicon is built in memory instead.
+
+    :param source: The path of the word list, one word per line, plain or compressed
+    :param path: The path of the cache file, by default next to the word list (see
+                 `cache_path()`)
+    :param lengths: If given, only words of these lengths are kept
+    :param min_score: If given, only words scored at least this are kept
+    :param case: 'lower', 'upper' or None (see `read_words()`)
+    :return: The `Lexicon`
+    '''
+
+    filters = describe_filters(lengths, min_score, case)
+    path = path or cache_path(source, filters)
+
+    try:
+
+        header, lexicon = read_cache(path)
+        status = os.stat(source)
+
+        if header.get('filters') != filters:
+
+            raise ValueError(f'{path} was built with other filters')
+
+        if (header['size'], header['mtime']) == (status.st_size, status.st_mtime_ns):
+
+            return lexicon
+
+        if header['digest'] == file_digest(source):
+
+            return lexicon
+
+    except (OSError, ValueError, KeyError):
+
+        pass
+
+    try:
+
+        return build_lexicon(source, path, lengths, min_score, case)
+
+    except OSError:
+
+        return stream_lexicon(source, lengths, min_score, case)
@@ -1,31 +1,520 @@
+import asyncio
 import sys
 
+import benchmark
+import daemon
+import solver
+import utility
+
+from batch import run_batch
+from cache import SolutionCache, cached_solve
+from components import solve_components
 from easy_crossword import EasyCrossword
-from hard_crossword import HardCrossword
+from engine import TRACE_EVENTS, TRACE_GRIDS, TRACE_OFF
+from formats import load_grid
+from hard_crossword import HARD_CROSSWORD, HardCrossword
+from instrumentation import Instrumentation, profiled, summary
+from lexicon import DEFAULT_CASE, build_lexicon, cache_path, describe_filters
+from parallel import new_solver, parallel_solve
+from portfolio import portfolio_solve, recommended_options
+from restarts import solve_with_restarts
+from solver import SolveOptions
+
+# The extra arguments that choose a search strategy (see `parse_options()`)
+STRATEGY_KEYWORDS = ('static', 'mrv', 'none', 'mac', 'cbj', 'lcv', 'letters')
+
+# The values of '--trace'
+TRACE_LEVELS = {'off': TRACE_OFF, 'events': TRACE_EVENTS, 'grids': TRACE_GRIDS}
+
+# The values of '--case', the case word lists are converted to when compiled
+CASES = {'lower': 'lower', 'upper': 'upper', 'keep': None}
+
+# The flags of 'build-lexicon', each followed by a value
+LEXICON_FLAGS = ('--lengths', '--grid', '--min-score', '--case')
+
+def parse_options(arguments):
+
+    '''Reads the search strategies out of the extra command-line arguments.
+
+    :param arguments: The arguments following the difficulty or command
+    :return: The `SolveOptions` they describe
+    :raises ValueError: If the strategies can't be combined, e.g. 'mrv' with 'none'
+    '''
+
+    options = [argument.lower() for argument in arguments]
+
+    ordering = 'mrv' if 'mrv' in options else 'static' if 'static' in options else 'degree'
+    propagation = 'mac' if 'mac' in options else 'none' if 'none' in options else 'forward'
+
+    options = SolveOptions(ordering=ordering,
+                           propagation=propagation,
+                           backjumping='cbj' in options,
+                           value_ordering='lcv' if 'lcv' in options else 'lexicon',
+                           fill='letter' if 'letters' in options else 'word')
+
+    # The engine rejects combinations it can't search with, so they are reported as
+    # invalid arguments before anything is loaded
+    solver.create_engine(options)
+
+    return options
+
+
+def parse_trace(arguments):
+
+    '''Reads the trace level and instrumentation out of the extra command-line arguments.
+
+    :param arguments: The arguments following the difficulty
+    :return: The trace level, and an `Instrumentation` if '--stats' or '--snapshot' was
+             given, otherwise None
+    '''
+
+    trace = TRACE_OFF
+    instrumentation = None
+
+    if '--trace' in arguments:
+
+        trace = TRACE_LEVELS[arguments[arguments.index('--trace') + 1].lower()]
+
+    if '--stats' in arguments or '--snapshot' in arguments:
+
+        interval = None
+
+        if '--snapshot' in arguments:
+
+            interval = int(arguments[arguments.index('--snapshot') + 1])
+
+        instrumentation = Instrumentation(interval, lambda snapshot: print(summary(snapshot)))
+
+    return trace, instrumentation
+
+
+def run_solver(crossword, arguments):
+
+    '''Solves a bundled puzzle, profiling it and dumping its counters if asked to.
+
+    :param crossword: The `EasyCrossword` or `HardCrossword` to be run
+    :param arguments: The arguments following the difficulty
+    '''
+
+    if '--profile' in arguments:
+
+        with profiled():
+
+            crossword.generate_attributes()
+
+    else:
+
+        crossword.generate_attributes()
+
+    if '--stats' in arguments:
+
+        path = arguments[arguments.index('--stats') + 1]
+        crossword.instrumentation.dump(path)
+        print(f'Search statistics written to {path}')
+
+
+def flag_value(arguments, flag, convert=str, default=None):
+
+    '''Reads the value following an optional flag, such as '--workers 4'.
+
+    :param arguments: The command-line arguments
+    :param flag: The flag
+    :param convert: The function turning the value into what is needed, e.g. `int`
+    :param default: What is returned if the flag isn't given
+    :return: The converted value, or `default`
+    :raises IndexError: If the flag is the last argument
+    :raises ValueError: If the value can't be converted
+    '''
+
+    if flag not in arguments:
+
+        return default
+
+    return convert(arguments[arguments.index(flag) + 1])
+
+
+def parse_command(arguments):
+
+    '''Reads the command and everything it needs out of the command-line arguments.
+
+    Nothing is loaded or solved here, so a malformed argument is told apart from an
+    error while running the command.
+
+    :param arguments: The arguments following the program name
+    :return: A dictionary of the 'command' and its settings
+    :raises IndexError: If an argument is missing
+    :raises KeyError: If the command or a named value is unknown
+    :raises ValueError: If a value is malformed, or the strategies can't be combined
+    '''
+
+    command = arguments[0].lower()
+    extra = arguments[1:]
+    settings = {'command': command, 'arguments': extra}
+
+    if command == 'easy':
+
+        settings['trace'], settings['instrumentation'] = parse_trace(extra)
+
+    elif command == 'build-lexicon':
+
+        # '--lengths 3,4,5' and the word space lengths of '--grid PATH' keep only words of
+        # those lengths, '--min-score N' only words scored N or more
+        settings['lengths'] = flag_value(extra, '--lengths',
+                                         lambda value: {int(length)
+                                                        for length in value.split(',')})
+        settings['grid'] = flag_value(extra, '--grid')
+        settings['min_score'] = flag_value(extra, '--min-score', float)
+        settings['case'] = flag_value(extra, '--case', lambda value: CASES[value.lower()],
+                                      DEFAULT_CASE)
+
+        # The given word lists, or both bundled ones
+        values = {extra.index(flag) + 1 for flag in LEXICON_FLAGS if flag in extra}
+        settings['sources'] = ([argument for i, argument in enumerate(extra)
+                                if argument not in LEXICON_FLAGS and i not in values]
+                               or ['wordlists/easy_wordlist.txt',
+                                   'wordlists/hard_wordlist.txt'])
+
+    elif command == 'hard':
+
+        settings['trace'], settings['instrumentation'] = parse_trace(extra)
+        settings['grid'] = flag_value(extra, '--grid', default=HARD_CROSSWORD)
+        settings['workers'] = flag_value(extra, '--workers', int)
+        settings['cache'] = flag_value(extra, '--cache')
+        settings['timeout'] = flag_value(extra, '--timeout', float)
+
+        # Optional extra arguments choose the strategies, otherwise the configuration
+        # that has usually won portfolio races on puzzles like this one is used
+        settings['options'] = None
+
+        if any(argument.lower() in STRATEGY_KEYWORDS for argument in extra):
+
+            settings['options'] = parse_options(extra)
+
+        # '--workers' splits the search tree unless another mode uses the workers, which
+        # needs a word by word search
+        modes = ('portfolio', 'regions', 'restarts')
+
+        if (settings['options'] is not None and settings['workers'] is not None
+                and settings['cache'] is None and not any(mode in extra for mode in modes)):
+
+            new_solver(settings['options'])
+
+    elif command == 'batch':
+
+        # '--wordlist PATH' and '--workers N' may appear among the strategy options
+        settings['puzzles'] = extra[0]
+        settings['source'] = flag_value(extra[1:], '--wordlist',
+                                        default='wordlists/hard_wordlist.txt')
+        settings['workers'] = flag_value(extra[1:], '--workers', int)
+        settings['options'] = parse_options(extra[1:])
+
+    elif command == 'serve':
+
+        settings['source'] = flag_value(extra, '--wordlist',
+                                        default='wordlists/hard_wordlist.txt')
+        settings['socket'] = flag_value(extra, '--socket', default=daemon.SOCKET_PATH)
+        settings['port'] = flag_value(extra, '--port', int)
+        settings['workers'] = flag_value(extra, '--workers', int)
+        settings['backlog'] = flag_value(extra, '--backlog', int)
+
+    elif command == 'load-test':
+
+        settings['socket'] = flag_value(extra, '--socket', default=daemon.SOCKET_PATH)
+        settings['port'] = flag_value(extra, '--port', int)
+        settings['requests'] = flag_value(extra, '--requests', int, 100)
+        settings['concurrency'] = flag_value(extra, '--concurrency', int, 8)
+        settings['deadline'] = flag_value(extra, '--deadline', float)
+        settings['options'] = None
+
+        if any(argument.lower() in STRATEGY_KEYWORDS for argument in extra):
+
+            settings['options'] = parse_options(extra)
+
+    elif command == 'benchmark':
+
+        settings['repeats'] = flag_value(extra, '--repeats', int, 5)
+        settings['baseline'] = flag_value(extra, '--baseline',
+                                          default=benchmark.BASELINE_PATH)
+
+    else:
+
+        raise KeyError(command)
+
+    return settings
+
+
+def print_result(result, *lines):
+
+    '''Prints a `SolveResult` the way every hard crossword mode reports it.
+
+    :param result: The `SolveResult`
+    :param lines: The mode's own lines, printed after the outcome
+    '''
+
+    if result.solved:
+
+        utility.print_puzzle(result.grid)
+
+    outcome = 'Puzzle solved' if result.solved else 'No solution found'
+    body = '\n\n'.join(lines)
+
+    print(f'''
+-- {outcome} after {result.elapsed} seconds --
+
+{body}
+''')
+
+
+def solve_hard(settings):
+
+    '''Fills the hard crossword, or another grid given with '--grid', in the chosen mode.
+
+    :param settings: The settings returned by `parse_command()`
+    '''
+
+    arguments = settings['arguments']
+    crossword_path = settings['grid']
+    source = 'wordlists/hard_wordlist.txt'
+    workers = settings['workers']
+
+    try:
+
+        crossword = load_grid(crossword_path, solver.cached_lexicon(source).letter_case())
+
+    except (ValueError, OSError) as error:
+
+        print(f'\n -- Could not load the grid {crossword_path}: {error} --\n')
+        return
+
+    if 'portfolio' in arguments:
+
+        # Race several strategy configurations, keeping the first to finish
+        name, result = portfolio_solve(crossword, source, workers=workers)
+        print_result(result, f'Winning configuration: {name}',
+                     f'Number of backtracks: {result.backtracks}')
+        return
+
+    options = settings['options'] or recommended_options(crossword, source)
+
+    # '--cache PATH' keeps solved puzzles and regions on disk for the next run
+    cache = SolutionCache(settings['cache']) if settings['cache'] is not None else None
+
+    if 'regions' in arguments:
+
+        # Solve each independent region of the grid on its own
+        result = solve_components(crossword, source, options, workers, cache)
+        print_result(result, f'Number of nodes across every region: {result.nodes}',
+                     f'Number of backtracks: {result.backtracks}')
+        return
+
+    if 'restarts' in arguments:
+
+        # Start over with random tie-breaking whenever an attempt runs too long
+        result = solve_with_restarts(crossword, source, options, settings['timeout'])
+        print_result(result, f'Number of restarts: {result.restarts}',
+                     f'Number of nodes across every attempt: {result.nodes}')
+        return
+
+    if cache is not None:
+
+        result = cached_solve(crossword, source, options, cache)
+        print_result(result, 'Found in the cache' if cache.hits else 'Searched and cached',
+                     f'Number of backtracks: {result.backtracks}')
+        return
+
+    if workers is None and options.fill == 'letter':
+
+        # Fill the grid a letter at a time from the lexicon's word graph
+        options.trace = settings['trace']
+        result = solver.solve(crossword, source, options)
+        print_result(result, f'Number of nodes: {result.nodes}',
+                     f'Number of backtracks: {result.backtracks}')
+        return
+
+    if workers is None:
+
+        run_solver(HardCrossword(options.ordering, options.propagation, options.backjumping,
+                                 options.value_ordering, settings['trace'],
+                                 settings['instrumentation'], crossword_path), arguments)
+        return
+
+    # Split the search tree of the one puzzle across several processes
+    result = parallel_solve(crossword, source, options, workers)
+    print_result(result, f'Number of nodes across {workers} workers: {result.nodes}',
+                 f'Number of backtracks: {result.backtracks}')
+
+
+def compile_word_lists(settings):
+
+    '''Compiles word lists into their cache files, with the filters given.
+
+    :param settings: The settings returned by `parse_command()`
+    '''
+
+    lengths = settings['lengths']
+
+    if settings['grid'] is not None:
+
+        try:
+
+            grid = load_grid(settings['grid'])
+
+        except (ValueError, OSError) as error:
+
+            print(f'\n -- Could not load the grid {settings["grid"]}: {error} --\n')
+            return
+
+        lengths = (lengths or set()) | utility.slot_lengths(grid)
+
+    filters = describe_filters(lengths, settings['min_score'], settings['case'])
+
+    for source in settings['sources']:
+
+        path = cache_path(source, filters)
+        build_lexicon(source, path, lengths, settings['min_score'], settings['case'])
+        print(f'Compiled {source} into {path}')
+
+
+def serve(settings):
+
+    '''Runs the solver daemon until it is interrupted or terminated.
+
+    :param settings: The settings returned by `parse_command()`
+    '''
+
+    port = settings['port']
+    address = f'port {port}' if port is not None else settings['socket']
+    server = daemon.Daemon(settings['source'], settings['workers'], settings['backlog'])
+
+    try:
+
+        asyncio.run(server.serve(settings['socket'], port,
+                                 lambda: print(f'Listening on {address}', flush=True)))
+
+    except KeyboardInterrupt:
+
+        pass
+
+    print('\nStopped')
+
+
+def load_test(settings):
+
+    '''Solves the hard crossword many times over with a running daemon.
+
+    :param settings: The settings returned by `parse_command()`
+    '''
+
+    with open(HARD_CROSSWORD, 'r') as crossword_file:
+
+        crossword = crossword_file.read()
+
+    stats = daemon.load_test(crossword, settings['options'], settings['requests'],
+                             settings['concurrency'], settings['deadline'],
+                             settings['socket'], settings['port'])
+
+    print(f'''
+Responses: {', '.join(f'{count} {status}' for status, count in stats['statuses'].items())}
+
+Throughput: {stats['throughput']:.1f} requests per second
+
+Latency: median {stats['median_latency'] * 1000:.2f} ms, p95 {stats['p95_latency'] * 1000:.2f} ms
+
+Search time: median {stats['median_search'] * 1000:.2f} ms, p95 {stats['p95_search'] * 1000:.2f} ms
+''')
+
+
+def run_benchmark(settings):
+
+    '''Runs the benchmark suite and compares it with the baseline, or saves it as one.
+
+    Exits with status 1 if a result regressed.
+
+    :param settings: The settings returned by `parse_command()`
+    '''
+
+    path = settings['baseline']
+    results = benchmark.run_suite(repeats=settings['repeats'])
+    print(benchmark.report(results))
+
+    # '--save' records this run as the baseline instead of comparing with it
+    if '--save' in settings['arguments']:
+
+        benchmark.save_baseline(results, path)
+        print(f'\nSaved the baseline to {path}')
+        return
+
+    baseline = benchmark.load_baseline(path)
+
+    if baseline is None:
+
+        print(f'\nNo baseline at {path}, run with --save to record one')
+
+    # Wrong fills are flagged even without a baseline
+    flagged = benchmark.regressions(results, baseline)
+
+    for key, message in flagged:
+
+        print(f'REGRESSION {key}: {message}')
+
+    if flagged:
+
+        sys.exit(1)
+
+    if baseline is not None:
+
+        print(f'\nNo regressions against {path}')
+
 
 def main():
 
     '''The main function for the Crossword Solver program.
 
     Arguments will be taken in from the command-line and will determine the difficulty the
-    program will run on.
+    program will run on. Only reading the arguments is reported as an invalid argument;
+    errors while solving are left to surface as they are.
     '''
 
     try:
 
-        if sys.argv[1].lower() == 'easy':
+        settings = parse_command(sys.argv[1:])
 
-            easy = EasyCrossword()
-            easy.generate_attributes()
+    except (IndexError, KeyError, ValueError):
 
-        elif sys.argv[1].lower() == 'hard':
+        print('\n -- Invalid argument entered, see README file for valid arguments --\n')
+        return
 
-            hard = HardCrossword()
-            hard.generate_attributes()
+    command = settings['command']
 
-    except IndexError:
+    if command == 'easy':
 
-        print('\n -- Invalid argument entered, see README file for valid arguments --\n')
+        run_solver(EasyCrossword(settings['trace'], settings['instrumentation']),
+                   settings['arguments'])
+
+    elif command == 'build-lexicon':
+
+        compile_word_lists(settings)
+
+    elif command == 'hard':
+
+        solve_hard(settings)
+
+    elif command == 'batch':
+
+        run_batch(settings['puzzles'], settings['source'], settings['options'],
+                  settings['workers'])
+
+    elif command == 'serve':
+
+        serve(settings)
+
+    elif command == 'load-test':
+
+        load_test(settings)
+
+    elif command == 'benchmark':
+
+        run_benchmark(settings)
 
 
 if __name__ == '__main__':
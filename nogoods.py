@@ -0,0 +1,104 @@
+'''A bounded store of the nogoods learned by conflict-directed backjumping.'''
+
+# How many nogoods are kept before the least recently used are evicted
+MAX_NOGOODS = 10000
+
+class Nogoods:
+
+    def __init__(self, capacity=MAX_NOGOODS):
+
+        '''Class keeps nogoods, combinations of words that can't appear in one solution.
+
+        A nogood is a frozenset of `(slot index, word)` pairs, stored as a key of its own,
+        so checking a combination is one hash probe. To know which combinations to check
+        when a word is about to be placed, each slot keeps the scopes of the nogoods it is
+        in: the sets of the other slots' indexes. Ex:
+
+                {(3, 'abaft'), (7, 'bayou')} -> scopes[3] has {7}, scopes[7] has {3}
+
+        Once `capacity` nogoods are stored, the least recently added or matched one is
+        evicted, so memory stays bounded however long the search runs.
+
+        :param capacity: The number of nogoods kept
+        '''
+
+        self.capacity = capacity
+
+        # The nogoods in least recently used order, and per slot, how many stored nogoods
+        # have each scope
+        self.entries = {}
+        self.scopes = {}
+
+
+    def __len__(self):
+
+        return len(self.entries)
+
+
+    def add(self, nogood):
+
+        '''Stores a nogood, evicting the least recently used one if the store is full.
+
+        :param nogood: A frozenset of `(slot index, word)` pairs
+        '''
+
+        if nogood in self.entries:
+
+            self.entries[nogood] = self.entries.pop(nogood)
+            return
+
+        self.entries[nogood] = None
+        self.count(nogood, 1)
+
+        if len(self.entries) > self.capacity:
+
+            oldest = next(iter(self.entries))
+            del self.entries[oldest]
+            self.count(oldest, -1)
+
+
+    def count(self, nogood, change):
+
+        '''Adds or removes a nogood's scopes, forgetting scopes no nogood has any more.
+
+        :param nogood: The nogood
+        :param change: 1 when it is stored, -1 when it is evicted
+        '''
+
+        indexes = [index for index, _ in nogood]
+
+        for index in indexes:
+
+            scopes = self.scopes.setdefault(index, {})
+            scope = frozenset(other for other in indexes if other != index)
+            scopes[scope] = scopes.get(scope, 0) + change
+
+            if scopes[scope] == 0:
+
+                del scopes[scope]
+
+
+    def find(self, index, word, assignment):
+
+        '''Looks for a stored nogood that placing a word would complete.
+
+        :param index: The index of the slot the word would be placed in
+        :param word: The word
+        :param assignment: The words of the filled slots, by slot index
+        :return: The nogood, or None
+        '''
+
+        for scope in self.scopes.get(index, ()):
+
+            if not all(other in assignment for other in scope):
+
+                continue
+
+            key = frozenset([(index, word)] + [(other, assignment[other]) for other in scope])
+
+            if key in self.entries:
+
+                self.entries[key] = self.entries.pop(key)
+                return key
+
+        return None
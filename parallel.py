@@ -0,0 +1,421 @@
+'''Solving a single crossword puzzle by splitting its search tree across processes.'''
+
+import multiprocessing
+import queue
+import time
+
+from engine import Engine
+from grid import EMPTY
+from lexicon import load_lexicon
+from solver import SolveOptions, SolveResult
+
+# How many nodes a worker expands between checks for cancellation and idle workers
+CHECK_INTERVAL = 256
+
+# How many seconds the parent waits for a result before checking that the workers live
+POLL_SECONDS = 0.1
+
+def new_solver(options):
+
+    '''Creates a quiet `Engine` with the given strategies.
+
+    :param options: The `SolveOptions` to search with
+    :return: The `Engine`
+    '''
+
+    # Tasks are prefixes of placed words, which a letter by letter search doesn't have
+    if options.fill != 'word':
+
+        raise ValueError('The search tree can only be split when filling word by word')
+
+    return Engine(options.ordering, options.propagation, options.backjumping,
+                  options.value_ordering)
+
+
+def replay(solver, crossword, prefix):
+
+    '''Places the words of a task's prefix, as the search would have.
+
+    Every word is checked as the search would have, as a task may come from a level whose
+    words were only checked when they came up (propagation 'none').
+
+    :param solver: A `Engine` that has been set up but not searched
+    :param crossword: The grid returned by `setup()`
+    :param prefix: A list of `(slot index, word)` pairs, in the order they are placed
+    :return: True/False, whether every word fit, was unused and kept every domain
+             non-empty
+    '''
+
+    slots = {slot.index: slot for slot in solver.slots}
+
+    for index, word in prefix:
+
+        slot = slots[index]
+
+        if word in solver.used[slot.length] or not crossword.fits(slot.cells, word):
+
+            return False
+
+        crossword.place(slot.cells, word)
+
+        if not solver.assign(slot, word):
+
+            return False
+
+    return True
+
+
+def rejected(solver, crossword, slot, words, mark, below):
+
+    '''Drops the words the search would have rejected at an open level of its tree.
+
+    The grid and the used words are put back as they were at that level while the words
+    are checked: the cells written since are emptied, and the words placed since don't
+    count as used.
+
+    :param solver: The `Engine` whose search is open at the level
+    :param crossword: The grid it is filling
+    :param slot: The slot of the level
+    :param words: The untried words of the level
+    :param mark: The length of the grid's trail when the level was opened
+    :param below: The words placed at the level and below it
+    :return: The words that would not have been rejected
+    '''
+
+    written = crossword.trail[mark:]
+    letters = [crossword.cells[cell] for cell in written]
+    used = solver.used[slot.length]
+
+    for cell in written:
+
+        crossword.cells[cell] = EMPTY
+
+    solver.used[slot.length] = used - set(below)
+    kept = [word for word in words if not solver.rejects(crossword, slot, word)]
+
+    solver.used[slot.length] = used
+
+    for cell, letter in zip(written, letters):
+
+        crossword.cells[cell] = letter
+
+    return kept
+
+
+def split(solver, crossword, prefix, depth):
+
+    '''Enumerates the prefixes of the first `depth` slots the search would choose.
+
+    :param solver: A `Engine` that has been set up but not searched
+    :param crossword: The grid returned by `setup()`, with the prefix already placed
+    :param prefix: The list of `(slot index, word)` pairs placed so far
+    :param depth: The number of further slots to branch on
+    :return: The list of prefixes, each a list of `(slot index, word)` pairs
+    '''
+
+    if depth == 0 or crossword.remaining == 0:
+
+        return [prefix]
+
+    slot = solver.select_slot(len(prefix))
+    prefixes = []
+
+    for word in solver.forward_check(crossword, slot):
+
+        if solver.rejects(crossword, slot, word):
+
+            continue
+
+        mark = crossword.place(slot.cells, word)
+        trail_mark = len(solver.trail)
+
+        if solver.assign(slot, word):
+
+            prefixes += split(solver, crossword, prefix + [(slot.index, word)], depth - 1)
+
+        solver.unassign(slot, trail_mark)
+        crossword.undo(mark)
+
+    return prefixes
+
+
+class Coordinator:
+
+    def __init__(self, context):
+
+        '''Class holds the state shared between the worker processes.
+
+        1. `tasks`, the queue of prefixes still to be searched.
+
+        2. `pending`, the number of tasks queued or being searched. The search is over
+        when it drops to zero.
+
+        3. `queued` and `hungry`, the number of tasks waiting in the queue and the number
+        of workers waiting for one. A busy worker hands off part of its subtree when
+        workers are hungry and nothing is queued (see `donate()`).
+
+        4. `stop`, set once a solution is found so every worker gives up.
+
+        :param context: The multiprocessing context the shared objects are created in
+        '''
+
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        self.pending = context.Value('i', 0)
+        self.queued = context.Value('i', 0)
+        self.hungry = context.Value('i', 0)
+        self.stop = context.Event()
+
+
+    def add(self, prefixes):
+
+        '''Queues prefixes to be searched.
+
+        :param prefixes: The list of prefixes, each a list of `(slot index, word)` pairs
+        '''
+
+        with self.pending.get_lock():
+
+            self.pending.value += len(prefixes)
+
+        with self.queued.get_lock():
+
+            self.queued.value += len(prefixes)
+
+        for prefix in prefixes:
+
+            self.tasks.put(prefix)
+
+
+    def donate(self, solver, crossword, prefix):
+
+        '''Hands off half of the untried words of the shallowest open level of a search.
+
+        Called through `Engine.on_node` every `CHECK_INTERVAL` nodes. The words are
+        cut from the end of the level's word list, so the loop over it stops early, and
+        each becomes a task whose prefix is the path down to that level. Words the search
+        would have rejected at that level are dropped (see `rejects()`).
+
+        :param solver: The `Engine` searching a task
+        :param crossword: The grid it is filling
+        :param prefix: The prefix of the task being searched
+        '''
+
+        if solver.num_nodes % CHECK_INTERVAL:
+
+            return
+
+        if self.stop.is_set():
+
+            solver.stopped = True
+            return
+
+        if self.hungry.value == 0 or self.queued.value > 0:
+
+            return
+
+        path = []
+
+        for level, frame in enumerate(solver.frames):
+
+            slot, words, position, _, mark = frame
+            untried = len(words) - position - 1
+
+            if untried > 0:
+
+                given = words[len(words) - (untried + 1) // 2:]
+                del words[len(words) - len(given):]
+
+                # Nothing can be learned from this level now that it isn't fully searched
+                frame[3] = True
+
+                below = [other[1][other[2]] for other in solver.frames[level:]]
+                given = rejected(solver, crossword, slot, given, mark, below)
+
+                self.add([prefix + path + [(slot.index, word)] for word in given])
+                return
+
+            path.append((slot.index, words[position]))
+
+
+def work(grid, source, options, coordinator):
+
+    '''Searches tasks from the shared queue until the puzzle is solved or none are left.
+
+    :param grid: The unfilled crossword as a list of row strings
+    :param source: The path of the word list
+    :param options: The `SolveOptions` to search with
+    :param coordinator: The `Coordinator` shared with the other workers
+    '''
+
+    lexicon = load_lexicon(source)
+    counters = [0, 0, 0, 0]
+
+    while not coordinator.stop.is_set():
+
+        with coordinator.hungry.get_lock():
+
+            coordinator.hungry.value += 1
+
+        try:
+
+            prefix = coordinator.tasks.get(timeout=0.01)
+
+        except queue.Empty:
+
+            if coordinator.pending.value == 0:
+
+                break
+
+            continue
+
+        finally:
+
+            with coordinator.hungry.get_lock():
+
+                coordinator.hungry.value -= 1
+
+        with coordinator.queued.get_lock():
+
+            coordinator.queued.value -= 1
+
+        solver = new_solver(options)
+        crossword = solver.setup(grid, lexicon)
+        solver.on_node = lambda solver: coordinator.donate(solver, crossword, prefix)
+
+        if crossword is not None and replay(solver, crossword, prefix):
+
+            solver.solve(crossword, len(prefix))
+
+        counters = [counters[0] + solver.num_nodes, counters[1] + solver.num_backtracks,
+                    counters[2] + solver.num_backjumps, counters[3] + solver.num_pruned]
+
+        if solver.solution is not None:
+
+            coordinator.results.put(('solution', solver.solution))
+            coordinator.stop.set()
+
+        with coordinator.pending.get_lock():
+
+            coordinator.pending.value -= 1
+
+    # Tasks left behind after a solution are never read, so don't wait to flush them
+    coordinator.tasks.cancel_join_thread()
+    coordinator.results.put(('counters', counters))
+
+
+def parallel_solve(grid, source, options=None, workers=None, depth=None):
+
+    '''Solves one crossword puzzle with several processes searching its tree.
+
+    The tree is split on the words of the first `depth` slots the search would choose,
+    and the resulting subtrees are queued as tasks. Idle workers take the next task, and
+    when the queue runs dry busy workers hand off parts of their subtrees, so unbalanced
+    subtrees are shared out. Every worker stops as soon as one finds a solution.
+
+    :param grid: The unfilled crossword, as a list of row strings or one string with a
+                 row per line
+    :param source: The path of the word list
+    :param options: The `SolveOptions` to search with, by default `SolveOptions()`
+    :param workers: The number of worker processes, by default one per core
+    :param depth: The number of slots to split on up front, by default one, or two if
+                  the first slot has too few words to keep every worker busy
+    :return: A `SolveResult` with the counters summed over every worker
+    :raises RuntimeError: If a worker died before the puzzle was solved, so part of the
+                          tree may not have been searched
+    '''
+
+    options = options or SolveOptions()
+    workers = workers or multiprocessing.cpu_count()
+
+    if isinstance(grid, str):
+
+        grid = grid.split()
+
+    start = time.perf_counter()
+    lexicon = load_lexicon(source)
+
+    solver = new_solver(options)
+    crossword = solver.setup(grid, lexicon)
+
+    if crossword is None:
+
+        return SolveResult(None, time.perf_counter() - start, pruned=solver.num_pruned)
+
+    if solver.completion_check(crossword):
+
+        return SolveResult(solver.solution, time.perf_counter() - start)
+
+    prefixes = split(solver, crossword, [], depth or 1)
+
+    if depth is None and len(prefixes) < 4 * workers:
+
+        prefixes = split(solver, crossword, [], 2)
+
+    context = multiprocessing.get_context()
+    coordinator = Coordinator(context)
+    coordinator.add(prefixes)
+
+    processes = [context.Process(target=work, args=(grid, source, options, coordinator))
+                 for _ in range(workers)]
+
+    for process in processes:
+
+        process.start()
+
+    solution = None
+    counters = [0, 0, 0, solver.num_pruned]
+    finished = 0
+
+    # Every worker reports its counters once when it exits. One that dies without doing
+    # so, e.g. killed or out of memory, is noticed when no result comes for a while
+    while finished < workers:
+
+        try:
+
+            kind, value = coordinator.results.get(timeout=POLL_SECONDS)
+
+        except queue.Empty:
+
+            if any(process.exitcode not in (None, 0) for process in processes):
+
+                break
+
+            if not any(process.is_alive() for process in processes):
+
+                break
+
+            continue
+
+        if kind == 'solution' and solution is None:
+
+            solution = value
+
+        elif kind == 'counters':
+
+            counters = [total + count for total, count in zip(counters, value)]
+            finished += 1
+
+    coordinator.tasks.cancel_join_thread()
+
+    if finished < workers:
+
+        # The dead worker's task never finishes, so the others would wait for it forever
+        coordinator.stop.set()
+
+        for process in processes:
+
+            process.terminate()
+
+    for process in processes:
+
+        process.join()
+
+    if finished < workers and solution is None:
+
+        codes = [process.exitcode for process in processes]
+
+        raise RuntimeError(f'{workers - finished} of {workers} workers exited without '
+                           f'finishing the search (exit codes {codes})')
+
+    return SolveResult(solution, time.perf_counter() - start, *counters)
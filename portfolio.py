@@ -0,0 +1,240 @@
+'''Racing several search strategies on one crossword puzzle.'''
+
+import json
+import multiprocessing
+import os
+import queue
+import time
+
+import solver
+
+from solver import SolveOptions, SolveResult
+
+# The strategy combinations raced by default, by name, in the order they are tried when
+# there are fewer workers than configurations and nothing has been recorded
+CONFIGURATIONS = {
+    'degree': SolveOptions('degree', 'forward'),
+    'mac': SolveOptions('mrv', 'mac', value_ordering='lcv'),
+    'cbj': SolveOptions('degree', 'forward', backjumping=True),
+    'mrv': SolveOptions('mrv', 'forward'),
+    'backtracking': SolveOptions('static', 'none'),
+}
+
+# Used when nothing has been recorded for a puzzle class yet
+DEFAULT_CONFIGURATION = 'degree'
+
+STATS_PATH = 'portfolio_stats.json'
+
+def puzzle_class(grid, source):
+
+    '''Describes the kind of puzzle a grid is, so results can be compared across puzzles.
+
+    Puzzles of the same size and roughly the same share of blocks, filled from the same
+    word list, tend to favour the same strategies.
+
+    :param grid: The unfilled crossword as a list of row strings
+    :param source: The path of the word list
+    :return: The class, as a string such as 'hard_wordlist.txt 5x6 30%'
+    '''
+
+    cells = ''.join(grid)
+    blocks = 10 * round(10 * cells.count('#') / len(cells))
+
+    return f'{os.path.basename(source)} {len(grid)}x{len(grid[0])} {blocks}%'
+
+
+def load_stats(path=STATS_PATH):
+
+    '''Reads the recorded results of earlier races.
+
+    :param path: The path of the statistics file
+    :return: A dictionary of puzzle class -> configuration name -> `{'runs', 'wins',
+             'elapsed'}`, empty if nothing has been recorded
+    '''
+
+    try:
+
+        with open(path, 'r') as stats_file:
+
+            return json.load(stats_file)
+
+    except (OSError, ValueError):
+
+        return {}
+
+
+def record(stats, cls, names, winner, elapsed, path=STATS_PATH):
+
+    '''Records the outcome of a race and saves the statistics.
+
+    :param stats: The statistics returned by `load_stats()`, updated in place
+    :param cls: The puzzle class (see `puzzle_class()`)
+    :param names: The names of the configurations that took part
+    :param winner: The name of the configuration that finished first
+    :param elapsed: The number of seconds the winner took
+    :param path: The path of the statistics file
+    '''
+
+    entries = stats.setdefault(cls, {})
+
+    for name in names:
+
+        entry = entries.setdefault(name, {'runs': 0, 'wins': 0, 'elapsed': 0.0})
+        entry['runs'] += 1
+
+        if name == winner:
+
+            entry['wins'] += 1
+            entry['elapsed'] += elapsed
+
+    # Written aside and moved into place, so concurrent runs never read half a file
+    temporary = f'{path}.{os.getpid()}.tmp'
+
+    with open(temporary, 'w') as stats_file:
+
+        json.dump(stats, stats_file, indent=2, sort_keys=True)
+
+    os.replace(temporary, path)
+
+
+def rank(stats, cls, names):
+
+    '''Orders configurations from most to least likely to win on a puzzle class.
+
+    Configurations are ranked by their share of wins, then by how fast their wins were.
+    Those never tried on the class come after those that have won, in the given order.
+
+    :param stats: The statistics returned by `load_stats()`
+    :param cls: The puzzle class (see `puzzle_class()`)
+    :param names: The names of the configurations to be ranked
+    :return: The names, best first
+    '''
+
+    entries = stats.get(cls, {})
+
+    def key(name):
+
+        entry = entries.get(name)
+
+        if entry is None or entry['runs'] == 0:
+
+            return (0, 0)
+
+        wins = entry['wins']
+
+        return (-wins / entry['runs'], entry['elapsed'] / wins if wins else 0)
+
+    return sorted(names, key=key)
+
+
+def recommended_options(grid, source, path=STATS_PATH):
+
+    '''Chooses the configuration that has usually won on puzzles like this one.
+
+    :param grid: The unfilled crossword, as a list of row strings or one string with a
+                 row per line
+    :param source: The path of the word list
+    :param path: The path of the statistics file
+    :return: The `SolveOptions` of the configuration, `DEFAULT_CONFIGURATION` if no race
+             on this class of puzzle has been recorded
+    '''
+
+    if isinstance(grid, str):
+
+        grid = grid.split()
+
+    stats = load_stats(path)
+    cls = puzzle_class(grid, source)
+    entries = stats.get(cls, {})
+    winners = [name for name in entries if name in CONFIGURATIONS and entries[name]['wins']]
+
+    if not winners:
+
+        return CONFIGURATIONS[DEFAULT_CONFIGURATION]
+
+    return CONFIGURATIONS[rank(stats, cls, winners)[0]]
+
+
+def race(grid, source, name, options, results):
+
+    '''Solves the puzzle with one configuration in a worker process.
+
+    :param grid: The unfilled crossword as a list of row strings
+    :param source: The path of the word list
+    :param name: The name of the configuration
+    :param options: The `SolveOptions` of the configuration
+    :param results: The queue the `(name, SolveResult)` pair is put on
+    '''
+
+    results.put((name, solver.solve(grid, source, options)))
+
+
+def portfolio_solve(grid, source, configurations=None, workers=None, timeout=None,
+                    path=STATS_PATH):
+
+    '''Solves one crossword puzzle by racing several configurations against each other.
+
+    Each configuration searches the whole puzzle in its own process, and the first one to
+    finish, with a solution or a proof that there is none, wins. The others are stopped.
+    With fewer workers than configurations, the configurations that have won most often on
+    this class of puzzle are raced. The winner is recorded (see `record()`).
+
+    :param grid: The unfilled crossword, as a list of row strings or one string with a
+                 row per line
+    :param source: The path of the word list
+    :param configurations: A dictionary of name -> `SolveOptions`, by default
+                           `CONFIGURATIONS`
+    :param workers: The number of configurations raced at once, by default all of them
+    :param timeout: The number of seconds to wait for a winner, by default no limit
+    :param path: The path of the statistics file, or None to record nothing
+    :return: A `(name, SolveResult)` pair, with the winner's name and result, or None and
+             an unsolved result if the time ran out
+    '''
+
+    configurations = configurations or CONFIGURATIONS
+    workers = workers or len(configurations)
+
+    if isinstance(grid, str):
+
+        grid = grid.split()
+
+    start = time.perf_counter()
+
+    # Loaded before forking, so every worker shares the same memory-mapped lexicon
+    solver.cached_lexicon(source)
+
+    stats = load_stats(path) if path else {}
+    cls = puzzle_class(grid, source)
+    names = rank(stats, cls, list(configurations))[:workers]
+
+    context = multiprocessing.get_context()
+    results = context.Queue()
+
+    processes = [context.Process(target=race,
+                                 args=(grid, source, name, configurations[name], results))
+                 for name in names]
+
+    for process in processes:
+
+        process.start()
+
+    try:
+
+        winner, result = results.get(timeout=timeout)
+
+    except queue.Empty:
+
+        winner, result = None, SolveResult(None, time.perf_counter() - start)
+
+    finally:
+
+        for process in processes:
+
+            process.terminate()
+            process.join()
+
+    if winner is not None and path:
+
+        record(stats, cls, names, winner, result.elapsed, path)
+
+    return winner, result
@@ -0,0 +1,83 @@
+'''Arc consistency (AC-3) constraint propagation over crossing word spaces.'''
+
+from collections import deque
+
+def crossing_arcs(slots):
+
+    '''Returns every arc of the crossing graph.
+
+    An arc `(slot, other, position, other_position)` says the letter at `position` of the
+    slot's word must equal the letter at `other_position` of the other slot's word. Each
+    crossing gives two arcs, one in each direction.
+
+    :param slots: The compiled slots of the puzzle
+    :return: The list of arcs
+    '''
+
+    return [(slot, other, position, other_position)
+            for slot in slots
+            for other, position, other_position in slot.crossings]
+
+
+def incoming_arcs(slot):
+
+    '''Returns the arcs pointing at a slot, i.e. the ones to revise after it changes.
+
+    :param slot: The slot whose domain just changed
+    :return: The arcs `(other, slot, other_position, position)` for every crossing
+    '''
+
+    return [(other, slot, other_position, position)
+            for other, position, other_position in slot.crossings]
+
+
+def ac3(lexicon, domains, arcs, update):
+
+    '''Makes the given arcs, and any arcs affected by them, consistent.
+
+    Each arc `(slot, other, position, other_position)` is revised by removing every word
+    from the slot's domain whose letter at `position` does not appear at `other_position`
+    of any word left in the other slot's domain. When a domain shrinks, the arcs pointing
+    at that slot are queued again (except the one from the slot that caused the change).
+
+    :param lexicon: The `Lexicon` the domains index into
+    :param domains: The current domain of each slot, indexed by `slot.index`
+    :param arcs: The arcs to revise first
+    :param update: Called as `update(slot, domain)` to store a narrowed domain
+    :return: The number of words pruned, or None if a domain was wiped out
+    '''
+
+    queue = deque(arcs)
+    queued = {(slot.index, other.index) for slot, other, _, _ in arcs}
+    pruned = 0
+
+    while queue:
+
+        slot, other, position, other_position = queue.popleft()
+        queued.discard((slot.index, other.index))
+
+        domain = domains[slot.index]
+        narrowed = lexicon.revise(domain, slot.length, position, domains[other.index],
+                                  other.length, other_position)
+
+        # Revising only ever removes words, so an unchanged size means nothing was removed
+        if lexicon.size(narrowed) == lexicon.size(domain):
+
+            continue
+
+        pruned += lexicon.size(domain) - lexicon.size(narrowed)
+        update(slot, narrowed)
+
+        # No word can fill the slot, so there is no point in searching any deeper
+        if lexicon.size(narrowed) == 0:
+
+            return None
+
+        for arc in incoming_arcs(slot):
+
+            if arc[0] is not other and (arc[0].index, slot.index) not in queued:
+
+                queue.append(arc)
+                queued.add((arc[0].index, slot.index))
+
+    return pruned
@@ -0,0 +1,91 @@
+'''Compiled crossword puzzle model: word spaces and the cells they share.'''
+
+import utility
+
+class Slot:
+
+    __slots__ = ('index', 'direction', 'start', 'cells', 'length', 'domain', 'crossings',
+                 'degree')
+
+    def __init__(self, index, direction, start, cells, domain):
+
+        '''Class stores the geometry of a single word space.
+
+        Everything the solver needs while searching is computed once here, so no hot loop
+        has to re-derive cell coordinates from the direction and start:
+
+        1. `cells`, the flat grid indexes the word space covers.
+
+        2. `domain`, a reference to the lexicon's words of the same length.
+
+        3. `crossings`, a list of `(other slot, my position, their position)` tuples, one
+        per cell shared with another word space. `degree` is the number of crossings.
+
+        :param index: The position of the slot in the order it was found
+        :param direction: Whether the word space is 'ACROSS' or 'DOWN'
+        :param start: The `(row, col)` coordinates of where the word space starts
+        :param cells: The flat cell indexes of the word space
+        :param domain: The words valid for the word space, or None if not needed
+        '''
+
+        self.index = index
+        self.direction = direction
+        self.start = start
+        self.cells = cells
+        self.length = len(cells)
+        self.domain = domain
+        self.crossings = []
+        self.degree = 0
+
+
+    def __repr__(self):
+
+        return f'Slot({self.direction}, {self.start}, length={self.length})'
+
+
+def compile_slots(crossword, grid, lexicon):
+
+    '''Finds every word space in a crossword puzzle and links the ones that cross.
+
+    :param crossword: The unfilled crossword puzzle as a list of row strings
+    :param grid: The `Grid` built from the same puzzle
+    :param lexicon: The `Lexicon` the domains are taken from, or None to leave them out,
+                    e.g. when filling letter by letter, where the words of each length
+                    would only be kept as strings for nothing
+    :return: The list of compiled slots, in the order they were found
+    '''
+
+    slots = []
+
+    # Every run of two or more cells, with or without a '*' marking its start
+    for direction, (i, j), word_length in utility.find_runs(crossword):
+
+        cells = grid.word_cells(direction, i, j, word_length)
+
+        domain = lexicon.words_of_length(word_length) if lexicon is not None else None
+        slots.append(Slot(len(slots), direction, (i, j), cells, domain))
+
+    # Map each cell to the (slot, position) pairs covering it, then link the pairs
+    covering = {}
+
+    for slot in slots:
+
+        for position, cell in enumerate(slot.cells):
+
+            covering.setdefault(cell, []).append((slot, position))
+
+    for pairs in covering.values():
+
+        for slot, position in pairs:
+
+            for other, other_position in pairs:
+
+                if other is not slot:
+
+                    slot.crossings.append((other, position, other_position))
+
+    for slot in slots:
+
+        slot.degree = len(slot.crossings)
+
+    return slots
@@ -0,0 +1,92 @@
+'''Restarting an unlucky search with growing node limits.'''
+
+import random
+import time
+
+from nogoods import Nogoods
+from solver import SolveOptions, SolveResult, prepare
+
+def luby(i):
+
+    '''Returns the i-th term of the Luby sequence, 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+
+    Scaling the node limit of each attempt by the sequence is within a constant factor of
+    the best fixed limit, without knowing the run time distribution of the puzzle.
+
+    :param i: The position in the sequence, starting at 1
+    :return: The term
+    '''
+
+    k = 1
+
+    while (1 << k) - 1 < i:
+
+        k += 1
+
+    if i == (1 << k) - 1:
+
+        return 1 << (k - 1)
+
+    return luby(i - (1 << (k - 1)) + 1)
+
+
+def solve_with_restarts(grid, lexicon, options=None, timeout=None, base=100, seed=None):
+
+    '''Solves a crossword puzzle in attempts with node limits, starting over after each.
+
+    Run times of backtracking search are heavy-tailed: an unlucky early word can keep it
+    busy far longer than a fresh start would take. Each attempt breaks ties in slot and
+    word ordering at random and gives up after `base * luby(attempt)` nodes. Nogoods
+    learned by backjumping are kept from one attempt to the next.
+
+    :param grid: The unfilled crossword, as a list of row strings or one string with a
+                 row per line
+    :param lexicon: A `Lexicon`, a list of words, or the path of a word list
+    :param options: The `SolveOptions` to search with, by default `SolveOptions()`
+    :param timeout: The number of seconds to give up after, by default no limit
+    :param base: The node limit of the first attempt
+    :param seed: The seed of the random tie-breaking, so runs can be repeated
+    :return: A `SolveResult` with the counters summed over every attempt. It is unsolved
+             if the time ran out or an attempt finished without a solution, which proves
+             there is none
+    '''
+
+    options = options or SolveOptions()
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    deadline = start + timeout if timeout is not None else None
+
+    counters = [0, 0, 0, 0]
+    nogoods = Nogoods()
+    attempt = 0
+
+    while True:
+
+        attempt += 1
+        limit = base * luby(attempt)
+
+        engine, crossword = prepare(grid, lexicon, options, seed=rng.getrandbits(32))
+        engine.nogoods = nogoods
+
+        def budget(engine):
+
+            if engine.num_nodes > limit or (deadline is not None
+                                            and time.perf_counter() > deadline):
+
+                engine.stopped = True
+
+        engine.on_node = budget
+
+        if crossword is not None:
+
+            engine.solve(crossword, 0)
+
+        counters = [counters[0] + engine.num_nodes, counters[1] + engine.num_backtracks,
+                    counters[2] + engine.num_backjumps, counters[3] + engine.num_pruned]
+
+        # Solved, proved unsolvable, or out of time
+        if (engine.solution is not None or not engine.stopped
+                or (deadline is not None and time.perf_counter() > deadline)):
+
+            return SolveResult(engine.solution, time.perf_counter() - start, *counters,
+                               restarts=attempt - 1)
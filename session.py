@@ -0,0 +1,361 @@
+'''Interactive editing of a crossword puzzle, re-solving only what an edit affects.'''
+
+import time
+
+import solver
+
+from solver import SolveOptions, SolveResult
+
+# The nodes a repair of part of the grid may expand before it is widened (see `repair()`)
+LOCAL_NODES = 2000
+
+def slot_key(slot):
+
+    '''Identifies a word space across recompilations of an edited grid.
+
+    :param slot: The compiled slot
+    :return: A `(direction, start, length)` tuple, the same for every compilation in
+             which the word space covers the same cells
+    '''
+
+    return (slot.direction, slot.start, slot.length)
+
+
+class Session:
+
+    def __init__(self, grid, lexicon, options=None, timeout=None):
+
+        '''Class keeps a crossword puzzle, its current fill and the edits made to it.
+
+        Each edit works out which word spaces it affects and re-solves only those, keeping
+        the words of every other word space (see `repair()`). The edits are:
+
+        1. `toggle_block()`, turning an empty cell into a block or back. Word spaces
+        whose cells changed lose their words.
+
+        2. `pin()` and `unpin()`, fixing a word space to a word or freeing it again.
+        Crossing word spaces whose words disagree with the pinned word are re-solved.
+
+        3. `ban()` and `unban()`, keeping a word out of the puzzle or letting it back in.
+        The word space holding a banned word is re-solved.
+
+        Every edit returns a `SolveResult`, with the counters of the repair, and leaves the
+        filled grid in `grid` (None if no fill was found).
+
+        The slots are compiled and the domains built once per grid shape, by one `Engine`
+        kept with its `Grid`. Each attempt at a repair puts them back through their trails
+        (see `Engine.reset()`), so only toggling a block compiles the grid again.
+
+        :param grid: The crossword, as a list of row strings or one string with a row per
+                     line, using '#' for blocks and '_', '.' or '*' for empty cells
+        :param lexicon: A `Lexicon`, a list of words, or the path of a word list
+        :param options: The `SolveOptions` to search with, by default `SolveOptions()`
+        :param timeout: The number of seconds an edit may search for before the grid is
+                        left unfilled, by default no limit
+        '''
+
+        if isinstance(grid, str):
+
+            grid = grid.split()
+
+        self.crossword = list(grid)
+        self.lexicon = solver.resolve_lexicon(lexicon)
+        self.options = options or SolveOptions()
+        self.timeout = timeout
+
+        # Kept words are placed the way an `Engine` places them (see `attempt()`)
+        if self.options.fill != 'word':
+
+            raise ValueError('An editing session can only fill word by word')
+
+        # By `slot_key()`, the word in each filled word space and the pinned words
+        self.fill = {}
+        self.pinned = {}
+        self.banned = set()
+
+        self.grid = None
+        self.slots = []
+
+        # The engine searching the current grid shape and the `Grid` it fills, which is
+        # None if propagation shows the grid can't be filled at all
+        self.engine = None
+        self.state = None
+        self.compile()
+
+
+    def compile(self):
+
+        '''Compiles the word spaces of the current grid and builds their domains.'''
+
+        self.engine, self.state = solver.prepare(self.crossword, self.lexicon, self.options)
+        self.slots = list(self.engine.slots)
+
+
+    def find_slot(self, row, col, direction):
+
+        '''Finds the word space starting on a cell.
+
+        :param row: The row the word space starts on
+        :param col: The column the word space starts on
+        :param direction: 'ACROSS' or 'DOWN'
+        :return: The slot
+        '''
+
+        for slot in self.slots:
+
+            if slot.start == (row, col) and slot.direction == direction.upper():
+
+                return slot
+
+        raise ValueError(f'No {direction.upper()} word space starts at ({row}, {col})')
+
+
+    def solve(self):
+
+        '''Fills every word space that isn't pinned.
+
+        :return: A `SolveResult`
+        '''
+
+        return self.repair({slot_key(slot) for slot in self.slots})
+
+
+    def toggle_block(self, row, col):
+
+        '''Turns an empty cell into a block, or a block into an empty cell.
+
+        :param row: The row of the cell
+        :param col: The column of the cell
+        :return: A `SolveResult`
+        '''
+
+        cells = list(self.crossword[row])
+        cells[col] = '_' if cells[col] == '#' else '#'
+        self.crossword[row] = ''.join(cells)
+
+        self.compile()
+        keys = {slot_key(slot) for slot in self.slots}
+
+        # Word spaces covering different cells than before are new ones
+        self.fill = {key: word for key, word in self.fill.items() if key in keys}
+        self.pinned = {key: word for key, word in self.pinned.items() if key in keys}
+
+        return self.repair(keys - set(self.fill))
+
+
+    def pin(self, row, col, direction, word):
+
+        '''Fixes a word space to a word.
+
+        :param row: The row the word space starts on
+        :param col: The column the word space starts on
+        :param direction: 'ACROSS' or 'DOWN'
+        :param word: The word, which has to be in the lexicon and agree with the crossing
+                     pinned words
+        :return: A `SolveResult`
+        '''
+
+        slot = self.find_slot(row, col, direction)
+        key = slot_key(slot)
+
+        if len(word) != slot.length or self.lexicon.word_id(word) is None:
+
+            raise ValueError(f'{word!r} is not a word of length {slot.length}')
+
+        if word in self.banned:
+
+            raise ValueError(f'{word!r} is banned')
+
+        if any(used == word and other != key for other, used in self.pinned.items()):
+
+            raise ValueError(f'{word!r} is pinned elsewhere')
+
+        for other, position, other_position in slot.crossings:
+
+            pinned = self.pinned.get(slot_key(other))
+
+            if pinned is not None and pinned[other_position] != word[position]:
+
+                raise ValueError(f'{word!r} disagrees with the pinned word {pinned!r}')
+
+        self.pinned[key] = word
+        self.fill[key] = word
+
+        # Crossing words that disagree with it, and any other use of it, have to change
+        affected = {other for other, used in self.fill.items()
+                    if used == word and other != key}
+
+        for other, position, other_position in slot.crossings:
+
+            crossing = self.fill.get(slot_key(other))
+
+            if crossing is not None and crossing[other_position] != word[position]:
+
+                affected.add(slot_key(other))
+
+        return self.repair(affected)
+
+
+    def unpin(self, row, col, direction):
+
+        '''Frees a pinned word space. Its word stays until another edit changes it.
+
+        :param row: The row the word space starts on
+        :param col: The column the word space starts on
+        :param direction: 'ACROSS' or 'DOWN'
+        :return: A `SolveResult`
+        '''
+
+        self.pinned.pop(slot_key(self.find_slot(row, col, direction)), None)
+
+        return self.repair(set())
+
+
+    def ban(self, word):
+
+        '''Keeps a word out of the puzzle.
+
+        :param word: The word
+        :return: A `SolveResult`
+        '''
+
+        if word in self.pinned.values():
+
+            raise ValueError(f'{word!r} is pinned')
+
+        self.banned.add(word)
+
+        return self.repair({key for key, used in self.fill.items() if used == word})
+
+
+    def unban(self, word):
+
+        '''Lets a banned word back into the puzzle. The fill is left as it is.
+
+        :param word: The word
+        :return: A `SolveResult`
+        '''
+
+        self.banned.discard(word)
+
+        return self.repair(set())
+
+
+    def repair(self, affected):
+
+        '''Re-solves the affected word spaces, keeping the words of the others.
+
+        Word spaces without a word are always re-solved. If the affected ones can't be
+        filled around the kept words within `LOCAL_NODES` nodes, the word spaces crossing
+        them are freed as well, and so on, until the whole grid but the pinned words is
+        searched without a node limit. The search gives up once `timeout` runs out.
+
+        :param affected: The `slot_key()` of every word space whose word has to change
+        :return: A `SolveResult` with the counters summed over every attempt
+        '''
+
+        start = time.perf_counter()
+        deadline = start + self.timeout if self.timeout is not None else None
+        counters = [0, 0, 0, 0]
+        slots = {slot_key(slot): slot for slot in self.slots}
+        free = {key for key in slots if key not in self.fill} | set(affected)
+        free -= set(self.pinned)
+        engine, crossword = self.engine, self.state
+
+        while True:
+
+            everything = free >= set(slots) - set(self.pinned)
+            solved = False
+
+            if crossword is not None:
+
+                engine.reset(crossword)
+                solved = self.attempt(engine, crossword, free,
+                                      None if everything else LOCAL_NODES, deadline)
+
+            counters = [counters[0] + engine.num_nodes, counters[1] + engine.num_backtracks,
+                        counters[2] + engine.num_backjumps, counters[3] + engine.num_pruned]
+
+            if solved or everything:
+
+                break
+
+            if deadline is not None and time.perf_counter() > deadline:
+
+                break
+
+            # Free the word spaces crossing the ones that couldn't be filled
+            wider = set(free)
+
+            for key in free:
+
+                wider.update(slot_key(other) for other, _, _ in slots[key].crossings)
+
+            wider -= set(self.pinned)
+            free = wider if wider != free else set(slots) - set(self.pinned)
+
+        if solved:
+
+            self.fill = {slot_key(slot): engine.assignment[slot.index]
+                         for slot in engine.slots}
+            self.grid = engine.solution
+
+        else:
+
+            self.fill = {key: word for key, word in self.fill.items() if key not in free}
+            self.grid = None
+
+        return SolveResult(self.grid, time.perf_counter() - start, *counters)
+
+
+    def attempt(self, engine, crossword, free, limit, deadline):
+
+        '''Searches the free word spaces with the words of the others placed first.
+
+        The kept words are placed as if the search had chosen them, by moving their slots
+        to the front of the engine's order.
+
+        :param engine: An `Engine` that has been set up, or reset, but not searched
+        :param crossword: The grid returned by its `setup()`
+        :param free: The `slot_key()` of every word space to be searched
+        :param limit: The number of nodes to give up after, or None for no limit
+        :param deadline: The `time.perf_counter()` to give up at, or None for no limit
+        :return: True/False, whether a fill was found
+        '''
+
+        if not engine.exclude(self.banned):
+
+            return False
+
+        kept = [slot for slot in engine.slots if slot_key(slot) not in free]
+        engine.slots = kept + [slot for slot in engine.slots if slot_key(slot) in free]
+
+        for slot in kept:
+
+            word = self.fill[slot_key(slot)]
+
+            # A kept word may clash with a word pinned or banned since, or a changed block
+            if word in engine.used[slot.length] or not crossword.fits(slot.cells, word):
+
+                return False
+
+            crossword.place(slot.cells, word)
+
+            if not engine.assign(slot, word):
+
+                return False
+
+        def budget(engine):
+
+            if (limit is not None and engine.num_nodes > limit or
+                    deadline is not None and time.perf_counter() > deadline):
+
+                engine.stopped = True
+
+        if limit is not None or deadline is not None:
+
+            engine.on_node = budget
+
+        engine.solve(crossword, len(kept))
+
+        return engine.solution is not None
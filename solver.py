@@ -0,0 +1,249 @@
+'''Library interface for solving crossword puzzles held in memory.'''
+
+import functools
+import time
+
+from engine import TRACE_OFF, Engine
+from letters import LetterEngine
+from lexicon import Lexicon, from_words, load_lexicon
+
+# What the search fills at each step (see `create_engine()`)
+FILLS = ('word', 'letter')
+
+class SolveOptions:
+
+    def __init__(self, ordering='degree', propagation='forward', backjumping=False,
+                 value_ordering='lexicon', trace=TRACE_OFF, instrumentation=None,
+                 fill='word'):
+
+        '''Class holds the search strategies used by `solve()`.
+
+        The options mirror the arguments of `Engine`, except for `fill`.
+
+        :param ordering: 'static', 'degree' or 'mrv'
+        :param propagation: 'none', 'forward' or 'mac'
+        :param backjumping: Whether to use conflict-directed backjumping
+        :param value_ordering: 'lexicon' or 'lcv'
+        :param trace: How much of the search is printed, `engine.TRACE_OFF`,
+                      `TRACE_EVENTS` or `TRACE_GRIDS`
+        :param instrumentation: An optional `Instrumentation` counting what the search
+                                does in each slot
+        :param fill: 'word' to place whole words with an `Engine`, or 'letter' to fill
+                     cells one letter at a time with a `LetterEngine`, which ignores the
+                     other strategies
+        '''
+
+        self.ordering = ordering
+        self.propagation = propagation
+        self.backjumping = backjumping
+        self.value_ordering = value_ordering
+        self.trace = trace
+        self.instrumentation = instrumentation
+        self.fill = fill
+
+
+class SolveResult:
+
+    def __init__(self, solution, elapsed, nodes=0, backtracks=0, backjumps=0, pruned=0,
+                 restarts=0):
+
+        '''Class holds the outcome of a call to `solve()`.
+
+        :param solution: The filled crossword as a list of row strings, or None
+        :param elapsed: The number of seconds spent compiling and searching
+        :param nodes: The number of search nodes expanded
+        :param backtracks: The number of words undone
+        :param backjumps: The number of backjumps made
+        :param pruned: The number of words removed by propagation
+        :param restarts: The number of times the search was started over
+        '''
+
+        self.solved = solution is not None
+        self.grid = solution
+        self.elapsed = elapsed
+        self.nodes = nodes
+        self.backtracks = backtracks
+        self.backjumps = backjumps
+        self.pruned = pruned
+        self.restarts = restarts
+
+
+    def as_dict(self):
+
+        '''Returns the result as a dictionary of plain values, e.g. to be written as JSON.'''
+
+        return {'solved': self.solved, 'grid': self.grid, 'elapsed': self.elapsed,
+                'nodes': self.nodes, 'backtracks': self.backtracks,
+                'backjumps': self.backjumps, 'pruned': self.pruned,
+                'restarts': self.restarts}
+
+
+    def __repr__(self):
+
+        return (f'SolveResult(solved={self.solved}, elapsed={self.elapsed:.6f}, '
+                f'nodes={self.nodes}, backtracks={self.backtracks})')
+
+
+@functools.lru_cache(maxsize=None)
+def cached_lexicon(source):
+
+    '''Loads a word list once per process.
+
+    :param source: The path of the word list
+    :return: The `Lexicon`, shared by every call asking for the same path
+    '''
+
+    return load_lexicon(source)
+
+
+def resolve_lexicon(lexicon):
+
+    '''Turns any of the accepted forms of a word list into a `Lexicon`.
+
+    :param lexicon: A `Lexicon`, a list of words, or the path of a word list (loaded
+                    once per process and reused)
+    :return: The `Lexicon`
+    '''
+
+    if isinstance(lexicon, str):
+
+        return cached_lexicon(lexicon)
+
+    if not isinstance(lexicon, Lexicon):
+
+        return from_words(lexicon)
+
+    return lexicon
+
+
+def create_engine(options, seed=None):
+
+    '''Creates the search engine for a set of options.
+
+    :param options: The `SolveOptions`
+    :param seed: If given, ties are broken at random (see `Engine`)
+    :return: An `Engine`, or a `LetterEngine` if `options.fill` is 'letter'
+    '''
+
+    if options.fill not in FILLS:
+
+        raise ValueError(f'Unknown fill {options.fill!r}, expected one of {FILLS}')
+
+    if options.fill == 'letter':
+
+        return LetterEngine(options.trace, seed)
+
+    return Engine(options.ordering, options.propagation, options.backjumping,
+                  options.value_ordering, options.trace, options.instrumentation, seed)
+
+
+def prepare(grid, lexicon, options, seed=None, used_words=()):
+
+    '''Creates an engine for a puzzle, ready to be searched.
+
+    :param grid: The unfilled crossword, as a list of row strings or one string with a
+                 row per line
+    :param lexicon: A `Lexicon`, a list of words, or the path of a word list
+    :param options: The `SolveOptions` to search with, or None for `SolveOptions()`
+    :param seed: If given, ties are broken at random (see `Engine`)
+    :param used_words: Words that may not be placed (see `Engine.setup()`)
+    :return: The engine (see `create_engine()`) and the `Grid` returned by its `setup()`,
+             which is None if propagation already shows there is no solution
+    '''
+
+    options = options or SolveOptions()
+
+    if isinstance(grid, str):
+
+        grid = grid.split()
+
+    lexicon = resolve_lexicon(lexicon)
+    solver = create_engine(options, seed)
+
+    return solver, solver.setup(grid, lexicon, used_words)
+
+
+def solve(grid, lexicon, options=None):
+
+    '''Solves a crossword puzzle without touching the filesystem or exiting.
+
+    :param grid: The unfilled crossword, as a list of row strings or one string with a
+                 row per line, using '#' for blocks and '_' or '.' for empty cells. Cells
+                 marked '*' are empty too, but word spaces are found without the markers
+    :param lexicon: A `Lexicon`, a list of words, or the path of a word list (loaded
+                    once per process and reused)
+    :param options: The `SolveOptions` to search with, by default `SolveOptions()`
+    :return: A `SolveResult`
+    '''
+
+    start = time.perf_counter()
+    solver, crossword = prepare(grid, lexicon, options)
+
+    if crossword is not None:
+
+        solver.solve(crossword, 0)
+
+    return SolveResult(solver.solution, time.perf_counter() - start, solver.num_nodes,
+                       solver.num_backtracks, solver.num_backjumps, solver.num_pruned)
+
+
+def solutions(grid, lexicon, options=None, limit=None):
+
+    '''Yields every solution of a crossword puzzle, as soon as each is found.
+
+    The search is resumed after each solution, so only one grid is held at a time however
+    many solutions there are. Stopping iteration early abandons the search.
+
+    :param grid: The unfilled crossword (see `solve()`)
+    :param lexicon: A `Lexicon`, a list of words, or the path of a word list
+    :param options: The `SolveOptions` to search with, by default `SolveOptions()`
+    :param limit: The most solutions to yield, by default all of them
+    :return: A generator of filled crosswords, each a list of row strings
+    '''
+
+    solver, crossword = prepare(grid, lexicon, options)
+
+    if crossword is None or limit == 0:
+
+        return
+
+    for count, filled in enumerate(solver.search(crossword, 0), 1):
+
+        yield list(filled)
+
+        if count == limit:
+
+            return
+
+
+def count_solutions(grid, lexicon, options=None, limit=None):
+
+    '''Counts the solutions of a crossword puzzle without building any of them.
+
+    Useful to check that a grid has a unique fill, e.g. `count_solutions(..., limit=2)`
+    stops as soon as a second solution turns up.
+
+    :param grid: The unfilled crossword (see `solve()`)
+    :param lexicon: A `Lexicon`, a list of words, or the path of a word list
+    :param options: The `SolveOptions` to search with, by default `SolveOptions()`
+    :param limit: The count to stop at, by default no limit
+    :return: The number of solutions, at most `limit`
+    '''
+
+    solver, crossword = prepare(grid, lexicon, options)
+
+    if crossword is None or limit == 0:
+
+        return 0
+
+    count = 0
+
+    for _ in solver.search(crossword, 0):
+
+        count += 1
+
+        if count == limit:
+
+            break
+
+    return count
@@ -16,190 +16,67 @@ def print_puzzle(crossword):
     print()
 
 
-def remaining_spaces(crossword):
+def find_runs(crossword):
 
-    '''Returns the number of empty spaces in a crossword puzzle.
+    '''Finds every word space in a crossword puzzle in one pass over its cells.
 
-    :param crossword: A puzzle state to have its remaining spaces counted
-    :return: The number of empty spaces left
-    '''
-
-    amount = 0
-
-    for row in crossword:
-
-        for element in row:
-
-            if element == '_':
-
-                amount += 1
-
-    return amount
-
-
-def is_across(crossword, row, col):
-
-    '''Determines whether the word space is across or not.
-
-    :param crossword: The unfilled crossword puzzle
-    :param row: The current row
-    :param col: The current column
-    :return: True/False, whether the word space is across or not
-    '''
-
-    if col == 0:
-
-        return crossword[row][col+1] != '#'
-
-    elif 0 < col < len(crossword[row]):
+    Any cell that isn't a block belongs to a word space, so no start markers are needed:
+    '_', '.', '*' and letters are all cells. Runs of a single cell aren't word spaces.
+    Each row keeps the across run it is in, and each column the down run, so every cell
+    is looked at once. Rows shorter than the longest are treated as blocked at the end.
 
-        return crossword[row][col-1] == '#' and crossword[row][col+1] != '#'
-
-    # If we're at the last column in the row
-    return False
-
-
-def is_down(crossword, row, col):
-
-    '''Determines whether the word space is down or not.
-
-    :param crossword: The unfilled crossword puzzle
-    :param row: The current row
-    :param col: The current column
-    :return: True/False, whether the word space is down or not
-    '''
-
-    if row == 0:
-
-        return crossword[row+1][col] != '#'
-
-    elif 0 < row < len(crossword):
-
-        return crossword[row-1][col] == '#' and crossword[row+1][col] != '#'
-
-    # If we're at the last row in the column
-    return False
-
-
-def across_length(crossword, i, j):
-
-    '''Obtains the length of a word space considered across.
-
-    :param crossword: The unfilled crossword puzzle
-    :param i: THe current row
-    :param j: The current column
-    :return: The length of the word space across
+    :param crossword: The crossword puzzle as a list of row strings
+    :return: The list of `(direction, (row, col), length)` word spaces, ordered by their
+             start cell, row by row, with the across word space first where both start
     '''
 
-    word_length = 0
-
-    while j < len(crossword[i]):
+    width = max((len(row) for row in crossword), default=0)
+    runs = []
 
-        if crossword[i][j] != '#':
+    # The run each column's cells are currently adding to, or None after a block
+    downs = [None] * width
 
-            word_length += 1
+    for i, row in enumerate(crossword):
 
-        else:
+        across = None
 
-            break
+        for j, element in enumerate(row):
 
-        j += 1
+            if element == '#':
 
-    return word_length
-
-
-def down_length(crossword, i, j):
-
-    '''Obtains the length of a word space considered down.
+                across = None
+                downs[j] = None
+                continue
 
-    :param crossword: The unfilled crossword puzzle
-    :param i: THe current row
-    :param j: The current column
-    :return: The length of the word space down
-    '''
+            if across is None:
 
-    word_length = 0
+                across = ['ACROSS', (i, j), 0]
+                runs.append(across)
 
-    while i < len(crossword):
+            if downs[j] is None:
 
-        if crossword[i][j] != '#':
+                downs[j] = ['DOWN', (i, j), 0]
+                runs.append(downs[j])
 
-            word_length += 1
+            across[2] += 1
+            downs[j][2] += 1
 
-        else:
+        for j in range(len(row), width):
 
-            break
+            downs[j] = None
 
-        i += 1
+    return [tuple(run) for run in runs if run[2] > 1]
 
-    return word_length
 
+def slot_lengths(crossword):
 
-def remove_word(crossword, attribute):
+    '''Obtains the lengths of the word spaces in a crossword puzzle.
 
-    '''Removes the last placed word on the crossword puzzle.
+    Words of any other length can never be placed, so a word list can be cut down to these
+    before it is loaded (see `lexicon.read_words()`).
 
-    :param crossword: A crossword puzzle state as a result of backtracking
-    :param attribute: The attribute that will have its current word deleted
-    :return: The crossword puzzle with the removed word
+    :param crossword: The unfilled crossword puzzle as a list of row strings
+    :return: The set of word space lengths
     '''
 
-    direction = attribute[0]
-    row, col = attribute[1]
-    word_length = len(attribute[2][1])
-
-    if direction == 'ACROSS':
-
-        new_row = []
-
-        # If a letter has a letter above or below it, leave the current letter alone
-        # because removing the letter would then alter other words.
-        # Else, replace the letter with '_' (i.e. blank space). Then append new row.
-        for i in range(col, col + word_length):
-
-            if row == 0 and crossword[row+1][i].isalpha():
-
-                new_row.append(crossword[row][i])
-
-            elif 0 < row < word_length and (crossword[row-1][i].isalpha() or
-                                            crossword[row+1][i].isalpha()):
-
-                new_row.append(crossword[row][i])
-
-            elif row == word_length and crossword[row-1][i].isalpha():
-
-                new_row.append(crossword[row][i])
-
-            else:
-
-                new_row.append('_')
-
-        new_row = crossword[row][:col], ''.join(new_row), \
-                                        crossword[row][col+word_length:]
-
-        crossword[row] = ''.join(new_row)
-
-    if direction == 'DOWN':
-
-        # If a letter has a letter to the left or right, leave the letter alone.
-        # Else, replace the letter with a '_'. Then append character by character.
-        for i in range(row, row + word_length):
-
-            if col == 0 and crossword[i][col+1].isalpha():
-
-                continue
-
-            elif 0 < col < word_length-1 and (crossword[i][col-1].isalpha() or
-                                            crossword[i][col+1].isalpha()):
-
-                continue
-
-            elif col == word_length-1 and crossword[i][col-1].isalpha():
-
-                continue
-
-            # Will not be executed unless all statements above are false.
-            new_column = crossword[i][:col], '_', crossword[i][col+1:]
-            crossword[i] = ''.join(new_column)
-
-    return crossword
+    return {length for _, _, length in find_runs(crossword)}